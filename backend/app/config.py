@@ -10,5 +10,52 @@ class Settings:
     DB_NAME: str = os.getenv("DB_NAME", "timetable")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "change-me")
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    # Groq client: endpoint (point it at a stub server to test), model,
+    # per-call timeout, pooled connections, calls in flight at once, retries
+    # of 429/5xx answers, and HTTP/2 (used when the h2 package is installed)
+    GROQ_BASE_URL: str = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+    GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+    GROQ_TIMEOUT: float = float(os.getenv("GROQ_TIMEOUT", "20"))
+    GROQ_MAX_CONNECTIONS: int = int(os.getenv("GROQ_MAX_CONNECTIONS", "10"))
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+    GROQ_MAX_RETRIES: int = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+    GROQ_HTTP2: bool = os.getenv("GROQ_HTTP2", "true").lower() in ("1", "true", "yes")
+    # the weekly timetable grid: days, periods per day, period length, first period
+    SCHEDULE_DAYS: int = int(os.getenv("SCHEDULE_DAYS", "5"))
+    SCHEDULE_SLOTS_PER_DAY: int = int(os.getenv("SCHEDULE_SLOTS_PER_DAY", "8"))
+    SCHEDULE_SLOT_MINUTES: int = int(os.getenv("SCHEDULE_SLOT_MINUTES", "60"))
+    SCHEDULE_DAY_START: str = os.getenv("SCHEDULE_DAY_START", "08:00")
+    # /ai/query answer cache: seconds an answer is reused, entries kept in
+    # memory, and an optional Mongo tier (shared, survives restarts) with its size
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", "3600"))
+    AI_CACHE_SIZE: int = int(os.getenv("AI_CACHE_SIZE", "1000"))
+    AI_CACHE_MONGO: bool = os.getenv("AI_CACHE_MONGO", "false").lower() in ("1", "true", "yes")
+    AI_CACHE_DB_SIZE: int = int(os.getenv("AI_CACHE_DB_SIZE", "10000"))
+    # rows accepted by one /bulk import request
+    BULK_IMPORT_MAX_ROWS: int = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+    # threads hashing/verifying passwords (bcrypt releases the GIL), calls
+    # allowed to wait for one before logins get 503, and the bcrypt cost
+    # factor (changing it rehashes passwords on the next login)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_MAX_QUEUE: int = int(os.getenv("PASSWORD_MAX_QUEUE", "100"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # verified bearer tokens kept in memory, and how long a faculty profile
+    # may be served from memory (updates through the API invalidate it)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    FACULTY_PROFILE_TTL: float = float(os.getenv("FACULTY_PROFILE_TTL", "30"))
+    # seconds before the in-memory snapshot of scheduling inputs is reloaded
+    # (only matters for writes from other processes without a change stream)
+    REFERENCE_SNAPSHOT_TTL: float = float(os.getenv("REFERENCE_SNAPSHOT_TTL", "300"))
+    # number of worker processes running CP-SAT solves in the background
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "2"))
+    # CP-SAT threads all running solves may use together
+    SCHEDULER_CPU_THREADS: int = int(os.getenv("SCHEDULER_CPU_THREADS", str(os.cpu_count() or 1)))
+    # jobs allowed to wait for a solver slot before requests get a 503
+    SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", "20"))
+    # processes used to solve independent parts of one timetable in parallel
+    SCHEDULER_COMPONENT_WORKERS: int = int(os.getenv("SCHEDULER_COMPONENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # solved schedules kept in memory / in the schedule_cache collection
+    SCHEDULE_CACHE_SIZE: int = int(os.getenv("SCHEDULE_CACHE_SIZE", "16"))
+    SCHEDULE_CACHE_DB_SIZE: int = int(os.getenv("SCHEDULE_CACHE_DB_SIZE", "200"))
 
 settings = Settings()
@@ -1,9 +1,30 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, ai, faculty, subject, schedule, room, batch
+from app.routers import auth, ai, faculty, subject, schedule, room, batch, metrics
+from app.services import decomposition, groq_service, indexes, passwords, reference_data, schedule_jobs, schedule_store
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await indexes.ensure_indexes()
+    await schedule_store.ensure_indexes()
+    # keeps the scheduling input snapshot in sync with writes from elsewhere
+    watcher = asyncio.create_task(reference_data.watch_changes())
+    # one pooled client for all Groq calls
+    groq_service.start()
+    yield
+    watcher.cancel()
+    await groq_service.stop()
+    # stop background solver processes and password workers
+    schedule_jobs.shutdown()
+    decomposition.shutdown()
+    passwords.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +32,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # paging cursor of the /all endpoints (see services/listing.py)
+    expose_headers=["X-Next-After"],
 )
 
 app.include_router(auth.router)
@@ -20,3 +43,4 @@ app.include_router(subject.router)
 app.include_router(schedule.router)
 app.include_router(room.router)
 app.include_router(batch.router)
+app.include_router(metrics.router)
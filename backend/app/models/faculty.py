@@ -1,6 +1,10 @@
 # app/models/faculty.py
 from pydantic import BaseModel, EmailStr
-from typing import List
+from typing import List, Optional, Union
+
+# A slot is sent as its number (day * slots per day + period) or as a label
+# like "Mon 09:00"; see app/services/calendar_grid.py.
+Slot = Union[int, str]
 
 class FacultyBase(BaseModel):
     name: str
@@ -8,11 +12,15 @@ class FacultyBase(BaseModel):
     department: str
     max_weekly_load: int
     subjects_can_teach: List[str] = []
-    available_slots: List[str] = []
+    # None = available the whole week, [] = not available at all
+    available_slots: Optional[List[Slot]] = None
 
 class FacultyCreate(FacultyBase):
     password: str
 
+class FacultyAvailability(BaseModel):
+    available_slots: List[Slot]
+
 class FacultyOut(BaseModel):
     id: str
     name: str
@@ -20,4 +28,6 @@ class FacultyOut(BaseModel):
     department: str
     max_weekly_load: int
     subjects_can_teach: List[str] = []
-    available_slots: List[str] = []
+    available_slots: List[int] = []
+    # the same availability as a hex bitmask, bit t = slot t
+    availability_mask: str = ""
@@ -1,7 +1,7 @@
 # app/routers/ai.py
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from app.services.groq_service import query_groq
+from app.services.groq_service import GroqError, query_groq
 from app.security import get_current_user
 
 
@@ -9,11 +9,18 @@ router = APIRouter(prefix="/ai", tags=["AI"])
 
 class AIPrompt(BaseModel):
     prompt: str
+    # reuse the answer to an identical earlier (or concurrent) prompt
+    use_cache: bool = True
 
 @router.post("/query")
 async def ai_query(payload: AIPrompt, current_user: dict = Depends(get_current_user)):
     try:
-        res = await query_groq(payload.prompt)
-        return {"ok": True, "result": res}
+        res, cached = await query_groq(payload.prompt, payload.use_cache)
+        return {"ok": True, "result": res, "cached": cached}
+    except GroqError as e:
+        if e.status_code == 429:
+            # still rate limited after the retries
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after or "5"})
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,12 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from app.services import faculty_service
+from app.services import faculty_service, passwords
 from app.models.faculty import FacultyOut
 from datetime import timedelta
 
 # Import the functions from our new security file
-from app.security import create_access_token, get_current_user
+from app.security import create_access_token, get_current_user, oauth2_scheme, revoke_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -20,13 +20,22 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     # 1. Find the user by email (which is the 'username' in the form)
     user = await faculty_service.get_faculty_by_email(form_data.username)
     
-    # 2. Check if user exists and password is correct
-    if not user or not faculty_service.verify_password(form_data.password, user["password"]):
+    # 2. Check if user exists and password is correct (bcrypt runs off the event loop)
+    ok, new_hash = False, None
+    if user:
+        try:
+            ok, new_hash = await passwords.verify_and_update(form_data.password, user["password"])
+        except passwords.PasswordBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # stored hash used an old cost factor
+        await faculty_service.set_password_hash(user["_id"], new_hash)
     
     # 3. Create a token for them
     access_token_expires = timedelta(minutes=60) # Token valid for 60 minutes
@@ -48,4 +57,13 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
     faculty = await faculty_service.get_faculty_by_id(current_user["id"])
     if not faculty:
         raise HTTPException(status_code=404, detail="Faculty not found")
-    return faculty
\ No newline at end of file
+    return faculty
+
+
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme), current_user: dict = Depends(get_current_user)):
+    """
+    Revoke the bearer token used for this request.
+    """
+    revoke_token(token)
+    return {"message": "Logged out"}
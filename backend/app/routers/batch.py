@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.batch import BatchCreate, BatchUpdate, BatchOut
+from app.services import bulk_import
 from app.services.batch_service import (
-    create_batch, get_batches, get_batch, update_batch, delete_batch
+    batch_json, bulk_create_batches, create_batch, find_batches, get_batch, update_batch, delete_batch
 )
+from app.services.listing import list_params, list_response
 
 router = APIRouter(prefix="/batch", tags=["Batch"])
 
@@ -12,10 +14,17 @@ async def add_batch(data: BatchCreate):
     batch = await create_batch(data)
     return batch
 
-# GET ALL
-@router.get("/all")
-async def list_batches():
-    return await get_batches()
+# BULK CREATE (JSON array or CSV file; reports errors per row)
+@router.post("/bulk")
+async def add_batches(request: Request):
+    rows = await bulk_import.read_rows(request, BatchCreate)
+    return await bulk_create_batches(rows)
+
+# GET ALL (streamed; ?limit=&after= for pages, ?format=ndjson for NDJSON)
+@router.get("/all", response_model=list[BatchOut])
+async def list_batches(params: dict = Depends(list_params)):
+    return await list_response(find_batches(params["limit"], params["after"]), batch_json,
+                               params["limit"], params["format"])
 
 # GET ONE
 @router.get("/{batch_id}", response_model=BatchOut)
@@ -29,6 +38,8 @@ async def get_single_batch(batch_id: str):
 @router.put("/update/{batch_id}", response_model=BatchOut)
 async def update_single_batch(batch_id: str, data: BatchUpdate):
     batch = await update_batch(batch_id, data)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
     return batch
 
 # DELETE
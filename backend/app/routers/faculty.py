@@ -1,21 +1,36 @@
 # app/routers/faculty.py
-from fastapi import APIRouter, Depends, HTTPException
-from app.models.faculty import FacultyCreate, FacultyOut, FacultyBase
-from app.services import faculty_service
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pymongo.errors import DuplicateKeyError
+from app.models.faculty import FacultyAvailability, FacultyCreate, FacultyOut, FacultyBase
+from app.services import bulk_import, faculty_service, passwords
+from app.services.listing import list_params, list_response
 from app.security import get_current_user
 
 router = APIRouter(prefix="/faculty", tags=["Faculty"])
 
 @router.post("/add", response_model=FacultyOut)
 async def add_faculty(data: FacultyCreate):
-    new_faculty = await faculty_service.create_faculty(data)
+    try:
+        new_faculty = await faculty_service.create_faculty(data)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except passwords.PasswordBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     if not new_faculty:
         raise HTTPException(status_code=400, detail="Email already exists")
     return new_faculty
 
+@router.post("/bulk")
+async def bulk_add_faculty(request: Request):
+    # JSON array of FacultyCreate or a CSV file; reports errors per row
+    rows = await bulk_import.read_rows(request, FacultyCreate)
+    return await faculty_service.bulk_create_faculties(rows)
+
+# streamed; ?limit=&after= for pages, ?format=ndjson for NDJSON
 @router.get("/all", response_model=list[FacultyOut])
-async def get_all_faculty(current_user: dict = Depends(get_current_user)):
-    return await faculty_service.get_all_faculties()
+async def get_all_faculty(params: dict = Depends(list_params), current_user: dict = Depends(get_current_user)):
+    cursor = faculty_service.find_faculties(params["limit"], params["after"])
+    return await list_response(cursor, faculty_service.faculty_json, params["limit"], params["format"])
 
 @router.get("/{faculty_id}", response_model=FacultyOut)
 async def get_faculty(faculty_id: str, current_user: dict = Depends(get_current_user)):
@@ -26,7 +41,12 @@ async def get_faculty(faculty_id: str, current_user: dict = Depends(get_current_
 
 @router.put("/update/{faculty_id}", response_model=FacultyOut)
 async def update_faculty(faculty_id: str, data: FacultyBase, current_user: dict = Depends(get_current_user)):
-    updated = await faculty_service.update_faculty_details(faculty_id, data)
+    try:
+        updated = await faculty_service.update_faculty_details(faculty_id, data)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already exists")
     if not updated:
         raise HTTPException(status_code=404, detail="Faculty not found")
     return updated
@@ -39,8 +59,12 @@ async def delete_faculty(faculty_id: str, current_user: dict = Depends(get_curre
     return {"message": "Faculty deleted successfully"}
 
 @router.put("/availability/{faculty_id}")
-async def update_availability(faculty_id: str, availability: dict, current_user: dict = Depends(get_current_user)):
-    success = await faculty_service.set_faculty_availability(faculty_id, availability)
+async def update_availability(faculty_id: str, availability: FacultyAvailability,
+                              current_user: dict = Depends(get_current_user)):
+    try:
+        success = await faculty_service.set_faculty_availability(faculty_id, availability.available_slots)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="Faculty not found")
     return {"message": "Availability updated"}
@@ -1,11 +1,15 @@
 # app/routers/room.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.room import RoomCreate, RoomOut
+from app.services import bulk_import
+from app.services.listing import list_params, list_response
 from app.services.room_service import (
     add_room_service,
-    get_all_rooms_service,
+    bulk_add_rooms_service,
+    find_rooms_service,
     get_room_service,
+    room_json,
     update_room_service,
     delete_room_service
 )
@@ -17,10 +21,17 @@ async def add_room(data: RoomCreate):
     room_id = await add_room_service(data)
     return {"status": "success", "room_id": room_id}
 
-@router.get("/all")
-async def get_all_rooms():
-    rooms = await get_all_rooms_service()
-    return rooms
+@router.post("/bulk")
+async def bulk_add_rooms(request: Request):
+    # JSON array of RoomCreate or a CSV file; reports errors per row
+    rows = await bulk_import.read_rows(request, RoomCreate)
+    return await bulk_add_rooms_service(rows)
+
+# streamed; ?limit=&after= for pages, ?format=ndjson for NDJSON
+@router.get("/all", response_model=list[RoomOut])
+async def get_all_rooms(params: dict = Depends(list_params)):
+    cursor = find_rooms_service(params["limit"], params["after"])
+    return await list_response(cursor, room_json, params["limit"], params["format"])
 
 @router.get("/{room_id}")
 async def get_room(room_id: str):
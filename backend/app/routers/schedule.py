@@ -1,25 +1,193 @@
-from fastapi import APIRouter
-from app.db import db
-from app.services.scheduler import generate_schedule
+import json
+import time
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from app.services import occupancy, reference_data, schedule_jobs, schedule_store
+from app.services.calendar_grid import DAYS, TOTAL_SLOTS
+from app.services.solver_capacity import SchedulerBusy
 
 router = APIRouter(prefix="/schedule", tags=["Scheduling Engine"])
 
 
+class SolverSettings(BaseModel):
+    # anything left out is picked from the instance size and available cores
+    time_limit: float | None = Field(None, gt=0, le=300)
+    num_workers: int | None = Field(None, ge=1)
+    random_seed: int | None = None
+    presolve_level: int | None = Field(None, ge=0, le=2)
+
+
+class SessionMove(BaseModel):
+    # fields left out keep their current value
+    slot: int | None = Field(None, ge=0, lt=TOTAL_SLOTS)
+    room_id: str | None = None
+    faculty_id: str | None = None
+
+
+class GenerateOptions(BaseModel):
+    # exact: CP-SAT, heuristic: greedy constructor only,
+    # anytime: greedy first, CP-SAT finishes what the greedy pass couldn't place
+    # interval: CP-SAT where a session spans ceil(duration_minutes / 60) slots
+    mode: Literal["exact", "heuristic", "anytime", "interval"] = "exact"
+    # use the latest stored schedule as solver hints
+    warm_start: bool = True
+    # keep sessions untouched by input changes fixed, re-optimise only the rest
+    pin_unaffected: bool = False
+    # split into independent components and solve them in parallel
+    decompose: bool = True
+    # reuse the result of an identical input snapshot
+    use_cache: bool = True
+    solver: SolverSettings | None = None
+    # higher starts first when jobs wait for a solver slot
+    priority: int = Field(0, ge=0, le=10)
+
+
 @router.post("/generate")
-async def generate_timetable():
+async def generate_timetable(options: GenerateOptions | None = None):
+    """
+    Starts a background solve and returns its job id immediately.
+    Poll GET /schedule/jobs/{job_id} for the result. Answers 503 with
+    Retry-After when too many jobs are already waiting for the solver.
+    """
+    options = options or GenerateOptions()
+
+    # in-memory snapshot, refetched from MongoDB only where it changed
+    fetch_start = time.perf_counter()
+    subjects, faculties, rooms, batches = await reference_data.get_inputs()
+    fetch_seconds = time.perf_counter() - fetch_start
+
+    try:
+        job = await schedule_jobs.submit_job(
+            subjects, faculties, rooms, batches,
+            warm_start=options.warm_start,
+            pin_unaffected=options.pin_unaffected,
+            decompose=options.decompose,
+            use_cache=options.use_cache,
+            mode=options.mode,
+            solver=options.solver.model_dump() if options.solver else None,
+            priority=options.priority,
+            fetch_seconds=fetch_seconds,
+        )
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return job
+
+
+@router.get("/latest")
+async def latest_schedule():
+    doc = await schedule_store.get_latest_schedule()
+    if not doc:
+        raise HTTPException(status_code=404, detail="No schedule generated yet")
+    return {"version": doc["version"], "created_at": doc["created_at"], "schedule": doc["schedule"]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_schedule_job(job_id: str):
+    job = schedule_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_schedule_job(job_id: str):
+    """
+    Server-Sent Events: a "solution" event with the first feasible schedule
+    (and the elapsed time) as soon as the solver has one, "progress" events,
+    and a final "done" event carrying the job result. When the timetable is
+    solved in independent parts, each part sends its own "solution" event
+    with "part"/"parts" and only that part's sessions; rooms are settled
+    across parts in the final result. POST /jobs/{job_id}/stop to keep the
+    current solution and finish early.
+    """
+    if not schedule_jobs.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_source():
+        async for event in schedule_jobs.stream_events(job_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/jobs/{job_id}/stop")
+async def stop_schedule_job(job_id: str):
+    job = schedule_jobs.stop_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_schedule_job(job_id: str):
+    job = schedule_jobs.cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# ----------------------------
+# STORED VERSIONS
+# ----------------------------
+
+async def _version_or_404(version: str) -> int:
+    number = await schedule_store.resolve_version(version)
+    if number is None:
+        raise HTTPException(status_code=404, detail="Schedule version not found")
+    return number
+
 
-    # Fetch data from MongoDB
-    subjects = await db["subjects"].find().to_list(None)
-    faculties = await db["faculties"].find().to_list(None)
-    rooms = await db["rooms"].find().to_list(None)
-    batches = await db["batches"].find().to_list(None)
+@router.get("/{version}")
+async def get_schedule_version(version: str):
+    """
+    A stored schedule by version number (or "latest").
+    """
+    doc = await schedule_store.get_schedule(await _version_or_404(version))
+    return {"version": doc["version"], "created_at": doc["created_at"], "schedule": doc["schedule"]}
 
-    schedule = await generate_schedule(subjects, faculties, rooms, batches)
 
-    if schedule is None:
-        return {"status": "fail", "message": "No valid schedule found"}
+@router.get("/{version}/{view}/{key}")
+async def get_schedule_view(version: str, view: Literal["faculty", "room", "batch"], key: str,
+                            day: int | None = Query(None, ge=0, lt=DAYS)):
+    """
+    Sessions of one faculty, room or batch (by id) in a stored version,
+    optionally for one day (0 = Monday), in slot order.
+    """
+    number = await _version_or_404(version)
+    entries = await schedule_store.get_view(number, view, key, day)
+    return {"version": number, view: key, "day": day, "entries": entries}
 
-    return {"status": "success", "schedule": schedule}
 
+@router.post("/{version}/sessions/{session_id}/check")
+async def check_session_move(version: str, session_id: str, move: SessionMove):
+    """
+    Would moving a session to another slot / room / faculty clash with
+    anything? Answers from the in-memory occupancy index, no solve.
+    """
+    index = await occupancy.get_index(await _version_or_404(version))
+    if session_id not in index.entries:
+        raise HTTPException(status_code=404, detail="Session not found")
+    entry, conflicts = index.check(session_id, move.slot, move.room_id, move.faculty_id)
+    return {"ok": not conflicts, "conflicts": conflicts, "entry": entry}
 
 
+@router.post("/{version}/sessions/{session_id}/move")
+async def move_session(version: str, session_id: str, move: SessionMove):
+    """
+    Apply a manual move to a stored version if it is conflict free;
+    409 with the conflicts otherwise.
+    """
+    number = await _version_or_404(version)
+    try:
+        entry, conflicts = await occupancy.move_session(number, session_id, move.slot, move.room_id, move.faculty_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if conflicts:
+        raise HTTPException(status_code=409, detail={"conflicts": conflicts})
+    return {"version": number, "entry": entry}
@@ -1,8 +1,10 @@
 # app/routers/subject.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pymongo.errors import DuplicateKeyError
 from app.models.subject import SubjectCreate, SubjectOut, SubjectBase
 # Import the new service
-from app.services import subject_service
+from app.services import bulk_import, subject_service
+from app.services.listing import list_params, list_response
 # Import the dependency from the correct security file
 from app.security import get_current_user
 
@@ -21,11 +23,20 @@ async def add_subject(data: SubjectCreate, current_user: dict = Depends(get_curr
     return new_subject
 
 
+# ---- BULK ADD SUBJECTS ----
+# JSON array of SubjectCreate or a CSV file; reports errors per row
+@router.post("/bulk")
+async def bulk_add_subjects(request: Request, current_user: dict = Depends(get_current_user)):
+    rows = await bulk_import.read_rows(request, SubjectCreate)
+    return await subject_service.bulk_create_subjects(rows)
+
+
 # ---- GET ALL SUBJECTS ----
-# FIX: response_model is now list[SubjectOut]
+# list[SubjectOut], streamed; ?limit=&after= for pages, ?format=ndjson for NDJSON
 @router.get("/all", response_model=list[SubjectOut])
-async def get_all_subjects(current_user: dict = Depends(get_current_user)):
-    return await subject_service.get_all_subjects()
+async def get_all_subjects(params: dict = Depends(list_params), current_user: dict = Depends(get_current_user)):
+    cursor = subject_service.find_subjects(params["limit"], params["after"])
+    return await list_response(cursor, subject_service.subject_json, params["limit"], params["format"])
 
 
 # ---- GET SUBJECT BY ID ----
@@ -44,7 +55,10 @@ async def get_subject(subject_id: str, current_user: dict = Depends(get_current_
 @router.put("/update/{subject_id}", response_model=SubjectOut)
 async def update_subject(subject_id: str, data: SubjectBase, current_user: dict = Depends(get_current_user)):
     
-    updated = await subject_service.update_subject_details(subject_id, data)
+    try:
+        updated = await subject_service.update_subject_details(subject_id, data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Subject code already exists")
 
     if not updated:
         raise HTTPException(status_code=404, detail="Subject not found")
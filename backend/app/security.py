@@ -1,23 +1,63 @@
 # app/security.py
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from app.config import settings
+from app.services import metrics
+from app.services.ttl_cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Tokens that passed verification, until their "exp": a repeat request costs
+# one dict lookup instead of an HMAC check and claim parsing. Revoking a
+# token or a user drops the cached entries first, so a hit is always valid.
+_verified = TTLCache(settings.TOKEN_CACHE_SIZE)
+_revoked = {}          # token -> exp, kept until the token would expire anyway
+_revoked_before = {}   # user id -> tokens issued ("iat") before this are invalid
+
+metrics.describe("auth_token_cache_total", "Bearer token checks, by cache hit or miss")
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=30)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
+def revoke_token(token: str):
+    """
+    Make a token unusable before its exp (logout).
+    """
+    _verified.pop(token)
+    try:
+        _revoked[token] = jwt.get_unverified_claims(token).get("exp", 0)
+    except JWTError:
+        return
+    now = time.time()
+    for stale in [t for t, exp in _revoked.items() if exp <= now]:
+        del _revoked[stale]
+
+def revoke_user(user_id: str):
+    """
+    Invalidate every token issued to a user so far (e.g. the faculty was deleted).
+    """
+    _revoked_before[user_id] = time.time()
+    _verified.pop_where(lambda user: user["id"] == user_id)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = _verified.get(token)
+    if user is not None:
+        metrics.inc("auth_token_cache_total", result="hit")
+        return user
+    metrics.inc("auth_token_cache_total", result="miss")
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,4 +71,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    return {"email": email, "id": user_id}
+    if token in _revoked or payload.get("iat", 0) < _revoked_before.get(user_id, 0):
+        raise credentials_exception
+
+    user = {"email": email, "id": user_id}
+    _verified.put(token, user, expires_at=payload["exp"])
+    return user
@@ -0,0 +1,126 @@
+# app/services/ai_cache.py
+# Response cache for /ai/query.
+#
+# The key is a hash of the request payload (model, parameters and messages)
+# with each message's text normalised: Unicode NFKC and runs of whitespace
+# collapsed, so "When is  CS101?\n" and "When is CS101?" share an answer.
+# Case is kept, it can change the meaning. Entries live AI_CACHE_TTL seconds
+# in a size bounded in-memory LRU and, with AI_CACHE_MONGO on, in a Mongo
+# collection that survives restarts and is shared between processes
+# (expired by a TTL index, see indexes.py, and kept to AI_CACHE_DB_SIZE).
+#
+# Concurrent identical requests are coalesced: the first one calls upstream,
+# the others await the same call. Failures are never cached.
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from datetime import datetime, timezone
+
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db import db
+from app.services import metrics
+from app.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+cache_col = db["ai_cache"]
+
+_memory = TTLCache(settings.AI_CACHE_SIZE)
+_inflight = {}  # key -> asyncio.Task of the upstream call
+
+metrics.describe("ai_cache_total", "AI queries, by where the answer came from")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(payload: dict) -> str:
+    payload = dict(payload)
+    payload["messages"] = [dict(m, content=normalise(m.get("content", ""))) for m in payload.get("messages", [])]
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def _get_stored(key):
+    if not settings.AI_CACHE_MONGO:
+        return None
+    try:
+        doc = await cache_col.find_one({"_id": key, "expires_at": {"$gt": time.time()}})
+    except PyMongoError as e:
+        logger.warning("AI cache read failed: %s", e)
+        return None
+    if not doc:
+        return None
+    _memory.put(key, doc["result"], expires_at=doc["expires_at"])
+    return doc["result"]
+
+
+async def _store(key, result):
+    expires_at = time.time() + settings.AI_CACHE_TTL
+    _memory.put(key, result, expires_at=expires_at)
+    if not settings.AI_CACHE_MONGO:
+        return
+    try:
+        # the TTL index needs a date; reads compare the plain timestamp
+        await cache_col.replace_one(
+            {"_id": key},
+            {"result": result, "expires_at": expires_at,
+             "expire_after": datetime.fromtimestamp(expires_at, timezone.utc)},
+            upsert=True,
+        )
+        # size bound: drop the entries closest to expiring
+        extra = await cache_col.count_documents({}) - settings.AI_CACHE_DB_SIZE
+        if extra > 0:
+            stale = await cache_col.find({}, {"_id": 1}).sort("expire_after", 1).limit(extra).to_list(None)
+            await cache_col.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+    except PyMongoError as e:
+        logger.warning("AI cache write failed: %s", e)
+
+
+async def _fetch(key, call):
+    result = await _get_stored(key)
+    if result is not None:
+        return result, "mongo"
+    result = await call()
+    await _store(key, result)
+    return result, "upstream"
+
+
+async def get_or_call(payload: dict, call):
+    """
+    Cached answer for `payload`, else the result of `await call()` (stored
+    for next time). Returns (result, source) with source one of "memory",
+    "mongo", "coalesced" or "upstream".
+    """
+    key = cache_key(payload)
+    result = _memory.get(key)
+    if result is not None:
+        metrics.inc("ai_cache_total", result="memory")
+        return result, "memory"
+
+    task = _inflight.get(key)
+    if task is not None:
+        metrics.inc("ai_cache_total", result="coalesced")
+        # shield: one caller going away must not cancel the call for the others
+        result, _ = await asyncio.shield(task)
+        return result, "coalesced"
+
+    task = asyncio.ensure_future(_fetch(key, call))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    result, source = await asyncio.shield(task)
+    metrics.inc("ai_cache_total", result=source)
+    return result, source
+
+
+def clear_memory():
+    _memory.clear()
@@ -1,5 +1,8 @@
 from app.db import db
 from bson import ObjectId
+from app.models.batch import BatchCreate, BatchOut
+from app.services import bulk_import, reference_data
+from app.services.listing import page_cursor
 
 batch_col = db["batches"]
 
@@ -11,16 +14,21 @@ def serialize(batch):
 
 # CREATE
 async def create_batch(data):
-    result = await batch_col.insert_one(data.dict())
-    new_batch = await batch_col.find_one({"_id": result.inserted_id})
-    return serialize(new_batch)
+    doc = data.dict()
+    result = await batch_col.insert_one(doc)
+    reference_data.mark_changed("batches", result.inserted_id)
+    return serialize(doc)
 
-# GET ALL
-async def get_batches():
-    batches = []
-    async for batch in batch_col.find():
-        batches.append(serialize(batch))
-    return batches
+def batch_json(batch):
+    return BatchOut(**serialize(batch)).model_dump_json()
+
+# LIST (keyset pages, see listing.py)
+def find_batches(limit=None, after=None):
+    return page_cursor(batch_col, limit, after)
+
+# BULK CREATE (JSON array or CSV, see bulk_import.py)
+async def bulk_create_batches(rows):
+    return await bulk_import.import_rows(batch_col, BatchCreate, rows)
 
 # GET ONE
 async def get_batch(batch_id: str):
@@ -30,11 +38,16 @@ async def get_batch(batch_id: str):
 # UPDATE
 async def update_batch(batch_id: str, data):
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
-    await batch_col.update_one({"_id": ObjectId(batch_id)}, {"$set": update_data})
-    updated = await batch_col.find_one({"_id": ObjectId(batch_id)})
+    updated = await batch_col.find_one_and_update(
+        {"_id": ObjectId(batch_id)}, {"$set": update_data}, return_document=True
+    )
+    if not updated:
+        return None
+    reference_data.mark_changed("batches", ObjectId(batch_id))
     return serialize(updated)
 
 # DELETE
 async def delete_batch(batch_id: str):
     await batch_col.delete_one({"_id": ObjectId(batch_id)})
+    reference_data.mark_changed("batches", ObjectId(batch_id))
     return True
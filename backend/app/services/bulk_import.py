@@ -0,0 +1,136 @@
+# app/services/bulk_import.py
+# Bulk import of faculties, subjects, rooms and batches.
+#
+# A request carries a JSON array of objects or a CSV file (text/csv body or
+# a multipart upload in the "file" field, header row = field names, list
+# fields separated by ";"). All rows are validated in one pass, rows that
+# repeat a unique field of an earlier row are rejected, and the rest is
+# written with one unordered insert_many, so one bad row never stops the
+# others; the unique indexes (indexes.py) reject rows that collide with
+# stored documents. The result lists the error of every rejected row by its
+# 1-based position in the input.
+import csv
+import io
+import json
+from typing import get_args, get_origin
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services import reference_data
+
+LIST_SEPARATOR = ";"
+
+
+def _is_list(annotation):
+    return get_origin(annotation) is list or any(_is_list(arg) for arg in get_args(annotation))
+
+
+def _from_csv(text, model):
+    list_fields = {name for name, field in model.model_fields.items() if _is_list(field.annotation)}
+    rows = []
+    for raw in csv.DictReader(io.StringIO(text)):
+        row = {}
+        for key, value in raw.items():
+            if key is None or value is None or not value.strip():
+                continue  # empty cell: the model default applies
+            key, value = key.strip(), value.strip()
+            row[key] = [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()] if key in list_fields else value
+        rows.append(row)
+    return rows
+
+
+async def read_rows(request: Request, model):
+    """
+    Rows of a bulk request as a list of dicts. JSON arrays are returned as
+    sent, CSV cells as strings (lists split) for the model to coerce.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Expected the CSV in a 'file' field")
+            rows = _from_csv((await upload.read()).decode("utf-8-sig"), model)
+        elif content_type.startswith("text/csv"):
+            rows = _from_csv((await request.body()).decode("utf-8-sig"), model)
+        elif content_type.startswith("application/json") or not content_type:
+            rows = json.loads(await request.body())
+            if not isinstance(rows, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON array")
+        else:
+            raise HTTPException(status_code=415, detail="Send a JSON array or a CSV file")
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read the import: {e}")
+
+    if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per import, got {len(rows)}")
+    return rows
+
+
+def _messages(error: ValidationError):
+    return [f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()]
+
+
+async def import_rows(col, model, rows, unique=None, prepare=None):
+    """
+    Validate `rows` against `model` and insert the valid ones into `col`.
+
+    unique:  field with a unique index; repeats and stored values are reported
+    prepare: async fn(list of validated items) -> list of documents (or
+             ValueError for a row), e.g. to hash passwords
+    Returns {"inserted": n, "ids": [...], "errors": [{"row": k, "errors": [...]}]}.
+    """
+    errors = {}
+    items = []  # (row number, validated model)
+    for row_no, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors[row_no] = ["row: expected an object"]
+            continue
+        try:
+            items.append((row_no, model.model_validate(row)))
+        except ValidationError as e:
+            errors[row_no] = _messages(e)
+
+    if unique:
+        seen = {}
+        for row_no, item in items:
+            value = getattr(item, unique)
+            if value in seen:
+                errors[row_no] = [f"{unique}: {value} repeats row {seen[value]}"]
+            else:
+                seen[value] = row_no
+        items = [(row_no, item) for row_no, item in items if row_no not in errors]
+
+    docs = await prepare([item for _, item in items]) if prepare else [item.model_dump() for _, item in items]
+    pending = []  # (row number, document)
+    for (row_no, _), doc in zip(items, docs):
+        if isinstance(doc, ValueError):
+            errors[row_no] = [str(doc)]
+        else:
+            pending.append((row_no, doc))
+
+    failed = set()
+    if pending:
+        try:
+            await col.insert_many([doc for _, doc in pending], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                row_no, doc = pending[write_error["index"]]
+                failed.add(row_no)
+                if write_error.get("code") == 11000 and unique:
+                    errors[row_no] = [f"{unique}: {doc[unique]} already exists"]
+                else:
+                    errors[row_no] = [write_error.get("errmsg", "write failed")]
+        # insert_many set _id on every document, written or not
+        reference_data.mark_changed(col.name, *(doc["_id"] for _, doc in pending))
+
+    ids = [str(doc["_id"]) for row_no, doc in pending if row_no not in failed]
+    return {
+        "inserted": len(ids),
+        "ids": ids,
+        "errors": [{"row": row_no, "errors": errors[row_no]} for row_no in sorted(errors)],
+    }
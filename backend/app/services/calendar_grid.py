@@ -0,0 +1,105 @@
+# app/services/calendar_grid.py
+# The weekly grid every part of the scheduler works on, and availability as
+# integer bitmasks over it (bit t set = available in slot t).
+#
+# The grid is configured with SCHEDULE_DAYS / SCHEDULE_SLOTS_PER_DAY /
+# SCHEDULE_SLOT_MINUTES / SCHEDULE_DAY_START. Slots are numbered day by day:
+# slot = day * SLOTS_PER_DAY + period. Masks are stored in Mongo as hex
+# strings, since a large grid doesn't fit a 64-bit int.
+from datetime import datetime, timedelta
+
+from app.config import settings
+
+DAYS = settings.SCHEDULE_DAYS
+SLOTS_PER_DAY = settings.SCHEDULE_SLOTS_PER_DAY
+TOTAL_SLOTS = DAYS * SLOTS_PER_DAY
+SLOT_MINUTES = settings.SCHEDULE_SLOT_MINUTES
+FULL_MASK = (1 << TOTAL_SLOTS) - 1
+
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# a Monday; only the weekday and time of day of generated timestamps matter
+WEEK_START = datetime(2024, 1, 1)
+_day_start = datetime.strptime(settings.SCHEDULE_DAY_START, "%H:%M")
+DAY_START = timedelta(hours=_day_start.hour, minutes=_day_start.minute)
+
+
+def slot_to_time(slot):
+    day, period = divmod(slot, SLOTS_PER_DAY)
+    return WEEK_START + timedelta(days=day) + DAY_START + timedelta(minutes=period * SLOT_MINUTES)
+
+
+def slot_label(slot):
+    # e.g. "Mon 09:00"
+    return f"{DAY_NAMES[slot // SLOTS_PER_DAY % 7]} {slot_to_time(slot).strftime('%H:%M')}"
+
+
+def parse_slot(value):
+    """
+    Slot number from an int, a numeric string or a label like "Mon 09:00".
+    Raises ValueError for anything else or a slot outside the grid.
+    """
+    if isinstance(value, str) and not value.strip().isdigit():
+        try:
+            day_name, clock = value.split()
+            day = DAY_NAMES.index(day_name[:3].capitalize())
+            at = datetime.strptime(clock, "%H:%M")
+        except ValueError:
+            raise ValueError(f"Invalid slot {value!r}, expected a slot number or e.g. 'Mon 09:00'")
+        minutes = at.hour * 60 + at.minute - int(DAY_START.total_seconds()) // 60
+        period, rest = divmod(minutes, SLOT_MINUTES)
+        if rest or not 0 <= period < SLOTS_PER_DAY:
+            raise ValueError(f"{value!r} is not the start of a slot")
+        slot = day * SLOTS_PER_DAY + period
+    else:
+        slot = int(value)
+    if not 0 <= slot < TOTAL_SLOTS:
+        raise ValueError(f"Slot {value!r} is outside the {DAYS}x{SLOTS_PER_DAY} grid")
+    return slot
+
+
+def span_mask(slot, length=1):
+    # `length` consecutive slots from `slot` on
+    return ((1 << length) - 1) << slot
+
+
+def to_mask(slots):
+    mask = 0
+    for slot in slots:
+        mask |= 1 << parse_slot(slot)
+    return mask
+
+
+def to_slots(mask):
+    slots = []
+    while mask:
+        low = mask & -mask
+        slots.append(low.bit_length() - 1)
+        mask ^= low
+    return slots
+
+
+def encode_mask(mask):
+    return format(mask, "x")
+
+
+def decode_mask(value):
+    return (int(value, 16) if isinstance(value, str) else int(value)) & FULL_MASK
+
+
+def availability_mask(faculty):
+    """
+    Availability of a faculty document as a mask: the stored
+    availability_mask, else a legacy available_slots list (invalid entries
+    are skipped), else the whole week.
+    """
+    if faculty.get("availability_mask") is not None:
+        return decode_mask(faculty["availability_mask"])
+    if "available_slots" in faculty:
+        mask = 0
+        for slot in faculty["available_slots"] or []:
+            try:
+                mask |= 1 << parse_slot(slot)
+            except (TypeError, ValueError):
+                continue
+        return mask
+    return FULL_MASK
@@ -0,0 +1,315 @@
+# app/services/decomposition.py
+# Split the timetable into independent parts and solve them in parallel.
+#
+# Sessions are linked when their subjects share a batch or an eligible
+# faculty; those links are hard couplings (batch/faculty clashes, faculty
+# load). Rooms are only a loose coupling: once the slots are known, room
+# assignment is an independent bipartite matching per slot, so rooms are
+# repaired after merging instead of gluing every component together. Each
+# part gets its own per-slot room budget up front so the merged slots fit.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from multiprocessing.util import Finalize
+
+from app.config import settings
+from app.services.scheduler import build_model, solve_schedule, subject_required_sizes
+from app.services.solver_profiles import cpu_budget
+
+# below this many sessions, process start-up costs more than it saves
+MIN_SESSIONS_TO_SPLIT = 60
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        ctx = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(max_workers=settings.SCHEDULER_COMPONENT_WORKERS, mp_context=ctx)
+        # the pool usually lives in a schedule_jobs worker process, which on
+        # exit joins its children: stop the pool first. Priority 20 runs this
+        # before that join and before the pool's own queues close (10).
+        Finalize(_pool, shutdown, exitpriority=20)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+    _pool = None
+
+
+def subject_components(subjects, faculties, batches):
+    """
+    Connected components of the subject conflict graph, as lists of subject codes.
+    """
+    parent = {s.get("code"): s.get("code") for s in subjects}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union_all(codes):
+        codes = [c for c in codes if c in parent]
+        for other in codes[1:]:
+            a, b = find(codes[0]), find(other)
+            if a != b:
+                parent[b] = a
+
+    for b in batches:
+        union_all(list(b.get("subjects", [])))
+    for f in faculties:
+        union_all(list(f.get("subjects_can_teach", [])))
+
+    groups = {}
+    for code in parent:
+        groups.setdefault(find(code), []).append(code)
+    return list(groups.values())
+
+
+def _pack(components, weights, bins):
+    # largest-first into the lightest bin, so the biggest part sets the pace
+    packed = [[] for _ in range(bins)]
+    load = [0] * bins
+    for comp in sorted(components, key=lambda c: -sum(weights[code] for code in c)):
+        i = load.index(min(load))
+        packed[i].extend(comp)
+        load[i] += sum(weights[code] for code in comp)
+    return [p for p in packed if p]
+
+
+def find_conflicts(schedule, batches):
+    """
+    Consistency check for a merged schedule: faculty, room and batch clashes.
+    Returns a list of human readable conflicts (empty when consistent).
+    """
+    conflicts = []
+    seen_fac, seen_room = {}, {}
+    for entry in schedule:
+        key = (entry["faculty_id"], entry["slot"])
+        if key in seen_fac:
+            conflicts.append(f"Faculty {entry['faculty']} double booked in slot {entry['slot']}")
+        seen_fac[key] = entry
+        key = (entry["room_id"], entry["slot"])
+        if key in seen_room:
+            conflicts.append(f"Room {entry['room']} double booked in slot {entry['slot']}")
+        seen_room[key] = entry
+
+    for b in batches:
+        codes = set(b.get("subjects", []))
+        slots = {}
+        for entry in schedule:
+            if entry["subject_code"] in codes:
+                if entry["slot"] in slots:
+                    conflicts.append(f"Batch {b.get('name')} has two sessions in slot {entry['slot']}")
+                slots[entry["slot"]] = entry
+    return conflicts
+
+
+def repair_rooms(schedule, subjects, rooms, batches):
+    """
+    Re-assign rooms slot by slot with a bipartite matching (Kuhn's algorithm),
+    keeping each session's current room whenever possible. Returns False if
+    some slot has more sessions than suitable rooms.
+    """
+    required = subject_required_sizes(subjects, batches)
+    room_by_id = {str(r.get("_id")): r for r in rooms}
+
+    by_slot = {}
+    for entry in schedule:
+        by_slot.setdefault(entry["slot"], []).append(entry)
+
+    for entries in by_slot.values():
+        options = []
+        for entry in entries:
+            need = required.get(entry["subject_code"], 0)
+            fits = [rid for rid, r in room_by_id.items() if r.get("capacity", 0) >= need]
+            # current room first, so augmenting paths prefer to keep it
+            fits.sort(key=lambda rid: rid != entry["room_id"])
+            options.append(fits)
+
+        owner = {}  # room id -> index in entries
+
+        def augment(i, visited):
+            for rid in options[i]:
+                if rid in visited:
+                    continue
+                visited.add(rid)
+                if rid not in owner or augment(owner[rid], visited):
+                    owner[rid] = i
+                    return True
+            return False
+
+        for i in range(len(entries)):
+            if not augment(i, set()):
+                return False
+
+        for rid, i in owner.items():
+            entries[i]["room_id"] = rid
+            entries[i]["room"] = room_by_id[rid].get("name")
+    return True
+
+
+def room_budgets(parts, subjects, rooms, batches):
+    """
+    Share the rooms out between the parts before they are solved.
+
+    For every required room size, each part may put at most its cap of the
+    sessions needing that size (or more) into one slot. Caps are proportional
+    to the part's share of those sessions and add up to the rooms that are
+    large enough, so every merged slot passes Hall's condition on the nested
+    room sets and repair_rooms can always place it.
+
+    Returns one [(size, cap)] list per part (sizes the part can never
+    overfill are left out), or None when some size has fewer rooms than
+    parts needing it.
+    """
+    required = subject_required_sizes(subjects, batches)
+    weekly = {s.get("code"): int(s.get("weekly_sessions", 1)) for s in subjects}
+    budgets = [[] for _ in parts]
+    for size in sorted(set(required.values())):
+        supply = sum(1 for r in rooms if r.get("capacity", 0) >= size)
+        demand = [sum(weekly[c] for c in codes if required.get(c, 0) >= size) for codes in parts]
+        total = sum(demand)
+        if total <= supply:
+            continue  # even all of them at once fit
+        needy = [k for k, d in enumerate(demand) if d]
+        if supply < len(needy):
+            return None
+        # largest remainder, at least one room per part
+        caps = {k: max(1, supply * demand[k] // total) for k in needy}
+        while sum(caps.values()) > supply:
+            caps[max((k for k in needy if caps[k] > 1), key=lambda k: caps[k])] -= 1
+        while sum(caps.values()) < supply:
+            caps[max(needy, key=lambda k: supply * demand[k] / total - caps[k])] += 1
+        for k in needy:
+            if caps[k] < demand[k]:
+                budgets[k].append((size, caps[k]))
+    return budgets
+
+
+def build_budgeted_model(subjects, faculties, rooms, batches, timer=None, groups=None, budget=()):
+    """
+    build_model plus one part's room budget (see room_budgets): per slot, at
+    most `cap` of its sessions that need a room for `size` or more students.
+    """
+    model, sessions = build_model(subjects, faculties, rooms, batches, timer, groups)
+    required = subject_required_sizes(subjects, batches)
+    for size, cap in budget:
+        intervals = [model.NewFixedSizeIntervalVar(ses["slot_var"], ses.get("length", 1), "")
+                     for ses in sessions if required.get(ses["subject"].get("code"), 0) >= size]
+        model.AddCumulative(intervals, [1] * len(intervals), cap)
+    return model, sessions
+
+
+class _PartProgress:
+    """
+    Progress queue of one part: passes its events on to the job's queue,
+    tagged with the part number. Picklable (the job's queue is a Manager
+    proxy), so it travels to the part's worker process.
+    """
+
+    def __init__(self, queue, part, parts):
+        self.queue = queue
+        self.part = part
+        self.parts = parts
+
+    def put(self, event):
+        self.queue.put(dict(event, part=self.part, parts=self.parts))
+
+
+def _merge_telemetry(parts):
+    # parts run concurrently: phases report the slowest part, sizes and search stats add up
+    phases = {}
+    for t in parts:
+        for name, seconds in t["phases"].items():
+            phases[name] = max(phases.get(name, 0.0), seconds)
+    model = {k: sum(t["model"][k] for t in parts) for k in ("sessions", "variables", "constraints")}
+    solver = {k: sum(t["solver"][k] for t in parts) for k in ("conflicts", "branches")}
+    solver["wall_time"] = max(t["solver"]["wall_time"] for t in parts)
+    solver["status"] = ",".join(sorted({t["solver"]["status"] for t in parts}))
+    return {"phases": phases, "model": model, "solver": solver, "parts": parts}
+
+
+def solve_decomposed(subjects, faculties, rooms, batches, stop_event=None, previous=None, pinned_ids=(), profile=None,
+                     progress=None):
+    """
+    Drop-in replacement for solve_schedule that solves independent parts of
+    the timetable in separate worker processes and merges the results.
+    """
+    if not subjects or not faculties or not rooms or not batches:
+        return solve_schedule(subjects, faculties, rooms, batches, stop_event, previous, pinned_ids, profile, progress=progress)
+
+    weights = {s.get("code"): int(s.get("weekly_sessions", 1)) for s in subjects}
+    components = subject_components(subjects, faculties, batches)
+    workers = settings.SCHEDULER_COMPONENT_WORKERS
+    if len(components) < 2 or workers < 2 or sum(weights.values()) < MIN_SESSIONS_TO_SPLIT:
+        result = solve_schedule(subjects, faculties, rooms, batches, stop_event, previous, pinned_ids, profile, progress=progress)
+        result["components"] = len(components)
+        return result
+
+    parts = _pack(components, weights, workers)
+    budgets = room_budgets(parts, subjects, rooms, batches)
+    if budgets is None:
+        # too few rooms of some size to give every part one
+        result = solve_schedule(subjects, faculties, rooms, batches, stop_event, previous, pinned_ids, profile, progress=progress)
+        result["components"] = len(components)
+        return result
+    pool = _get_pool()
+    # the parts run side by side: split this solve's worker budget between them
+    part_profile = dict(profile or {})
+    part_profile["num_workers"] = max(1, (part_profile.get("num_workers") or cpu_budget()) // len(parts))
+    futures = {}  # future -> its part's room budget
+    for k, (codes, budget) in enumerate(zip(parts, budgets), start=1):
+        codes = set(codes)
+        part_subjects = [s for s in subjects if s.get("code") in codes]
+        part_faculties = [f for f in faculties if codes & set(f.get("subjects_can_teach", []))]
+        if not part_faculties:
+            return {"status": "fail", "message": f"No available faculty/slot for subject {sorted(codes)[0]}"}
+        part_previous = [e for e in previous if e.get("subject_code") in codes] if previous else None
+        # each part streams its own solutions: the sessions of its subjects
+        # (rooms are settled across parts in the final result)
+        part_progress = _PartProgress(progress, k, len(parts)) if progress is not None else None
+        futures[pool.submit(
+            solve_schedule, part_subjects, part_faculties, rooms, batches,
+            stop_event, part_previous, pinned_ids, part_profile, progress=part_progress,
+            builder=partial(build_budgeted_model, budget=budget),
+        )] = budget
+
+    results = []
+    for k, future in enumerate(as_completed(futures), start=1):
+        results.append((future.result(), futures[future]))
+        if progress is not None:
+            progress.put({"type": "progress", "message": f"Solved part {k}/{len(futures)}"})
+    for res, budget in results:
+        # with all the rooms to itself a part has no schedule: neither has the whole
+        if res["status"] == "cancelled" or (res["status"] != "success" and not budget):
+            return res
+    results = [res for res, _ in results]
+
+    # a part that failed within its room budget is left to the fallback
+    if all(res["status"] == "success" for res in results):
+        # merge in input order so output matches the monolithic solve
+        by_id = {e["id"]: e for res in results for e in res["schedule"]}
+        order = [f"{str(s.get('_id'))}_{k}" for s in subjects for k in range(int(s.get("weekly_sessions", 1)))]
+        merged = [by_id[i] for i in order]
+        if repair_rooms(merged, subjects, rooms, batches) and not find_conflicts(merged, batches):
+            return {
+                "status": "success",
+                "schedule": merged,
+                "pinned_sessions": sum(r.get("pinned_sessions", 0) for r in results),
+                "components": len(components),
+                "telemetry": _merge_telemetry([r["telemetry"] for r in results]),
+            }
+        previous = merged
+
+    # a part didn't fit its room budget, or (safety net) the merged slots
+    # still don't fit the rooms: one model, warm-started from the merged
+    # attempt when there is one
+    result = solve_schedule(subjects, faculties, rooms, batches, stop_event, previous, pinned_ids, profile, progress=progress)
+    result["components"] = len(components)
+    return result
@@ -1,25 +1,38 @@
 # app/services/faculty_service.py
+from app import security
 from app.db import db
 from app.models.faculty import FacultyCreate, FacultyOut, FacultyBase
+from app.services import bulk_import, passwords, reference_data
+from app.services.listing import page_cursor
+from app.services.calendar_grid import FULL_MASK, availability_mask, encode_mask, to_mask, to_slots
+from app.config import settings
+from app.services.ttl_cache import TTLCache
 from bson import ObjectId
-from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError
 
-# bcrypt-safe hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+faculty_col = db["faculties"]
 
-def get_password_hash(password: str):
-    # bcrypt limitation: max 72 bytes -> truncate safely
-    return pwd_context.hash(str(password)[:72])
+# id -> FacultyOut for /auth/me and GET /faculty/{id}; writes below drop the
+# entry, FACULTY_PROFILE_TTL bounds staleness from writes elsewhere
+_profiles = TTLCache(1024)
+_profile_writes = 0
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(str(plain_password), hashed_password)
+def _forget_profile(faculty_id: str):
+    global _profile_writes
+    _profile_writes += 1  # a read that overlapped this write must not cache its result
+    _profiles.pop(faculty_id)
 
-faculty_col = db["faculties"]
+def _store_availability(doc: dict):
+    # availability is stored as a hex bitmask; raises ValueError for bad slots
+    slots = doc.pop("available_slots", None)
+    doc["availability_mask"] = encode_mask(FULL_MASK if slots is None else to_mask(slots))
+    return doc
 
 def _serialize_faculty(doc: dict) -> FacultyOut:
     # remove password if present (prevent Pydantic from seeing it)
     doc = dict(doc)  # shallow copy to avoid mutating original
     doc.pop("password", None)
+    mask = availability_mask(doc)
     return FacultyOut(
         id=str(doc.get("_id") or doc.get("id")),
         name=doc["name"],
@@ -27,51 +40,100 @@ def _serialize_faculty(doc: dict) -> FacultyOut:
         department=doc["department"],
         max_weekly_load=doc["max_weekly_load"],
         subjects_can_teach=doc.get("subjects_can_teach", []),
-        available_slots=doc.get("available_slots", []),
+        available_slots=to_slots(mask),
+        availability_mask=encode_mask(mask),
     )
 
 async def create_faculty(data: FacultyCreate):
-    existing = await faculty_col.find_one({"email": data.email})
-    if existing:
-        return None
-    doc = data.dict()
-    doc["password"] = get_password_hash(data.password)
+    doc = _store_availability(data.dict())
+    doc["password"] = await passwords.hash_password(data.password)
     doc["_id"] = str(ObjectId())
-    await faculty_col.insert_one(doc)
+    try:
+        await faculty_col.insert_one(doc)
+    except DuplicateKeyError:
+        # email already exists (unique index, see indexes.py)
+        return None
+    reference_data.mark_changed("faculties", doc["_id"])
     return _serialize_faculty(doc)
 
-async def get_all_faculties():
-    out = []
-    async for f in faculty_col.find({}):
-        out.append(_serialize_faculty(f))
-    return out
+async def _prepare_bulk(items):
+    docs = []
+    for item in items:
+        try:
+            docs.append(_store_availability(item.dict()))
+        except ValueError as e:
+            docs.append(e)
+    valid = [doc for doc in docs if isinstance(doc, dict)]
+    for doc, hashed in zip(valid, await passwords.hash_passwords([doc["password"] for doc in valid])):
+        doc["password"] = hashed
+        doc["_id"] = str(ObjectId())
+    return docs
+
+async def bulk_create_faculties(rows: list):
+    return await bulk_import.import_rows(faculty_col, FacultyCreate, rows, unique="email", prepare=_prepare_bulk)
+
+def find_faculties(limit=None, after=None):
+    # faculty ids are stored as strings
+    return page_cursor(faculty_col, limit, after, id_type=str, projection={"password": 0})
+
+def faculty_json(doc: dict):
+    return _serialize_faculty(doc).model_dump_json()
 
 async def get_faculty_by_id(faculty_id: str):
-    fac = await faculty_col.find_one({"_id": faculty_id})
+    profile = _profiles.get(faculty_id)
+    if profile is not None:
+        return profile
+    writes = _profile_writes
+    fac = await faculty_col.find_one({"_id": faculty_id}, {"password": 0})
     if not fac:
         return None
-    return _serialize_faculty(fac)
+    profile = _serialize_faculty(fac)
+    if writes == _profile_writes:
+        _profiles.put(faculty_id, profile, ttl=settings.FACULTY_PROFILE_TTL)
+    return profile
 
 async def get_faculty_by_email(email: str):
     return await faculty_col.find_one({"email": email})
 
 async def update_faculty_details(faculty_id: str, data: FacultyBase):
+    # raises DuplicateKeyError when the new email is taken
     updates = data.dict(exclude_unset=True)
+    change = {"$set": updates}
+    if "available_slots" in updates:
+        _store_availability(updates)
+        change["$unset"] = {"available_slots": ""}  # legacy list field
     if "password" in updates:
-        updates["password"] = get_password_hash(updates["password"])
+        updates["password"] = await passwords.hash_password(updates["password"])
     updated = await faculty_col.find_one_and_update(
         {"_id": faculty_id},
-        {"$set": updates},
+        change,
         return_document=True
     )
+    _forget_profile(faculty_id)
     if not updated:
         return None
+    reference_data.mark_changed("faculties", faculty_id)
     return _serialize_faculty(updated)
 
+async def set_password_hash(faculty_id: str, hashed: str):
+    # e.g. rehash on login after BCRYPT_ROUNDS changed
+    await faculty_col.update_one({"_id": faculty_id}, {"$set": {"password": hashed}})
+
 async def remove_faculty(faculty_id: str):
     res = await faculty_col.delete_one({"_id": faculty_id})
+    reference_data.mark_changed("faculties", faculty_id)
+    _forget_profile(faculty_id)
+    if res.deleted_count:
+        # its tokens must not outlive the account
+        security.revoke_user(faculty_id)
     return res.deleted_count > 0
 
-async def set_faculty_availability(faculty_id: str, availability: dict):
-    res = await faculty_col.update_one({"_id": faculty_id}, {"$set": {"availability": availability}})
-    return res.modified_count > 0
+async def set_faculty_availability(faculty_id: str, slots: list):
+    # raises ValueError for slots outside the grid
+    res = await faculty_col.update_one(
+        {"_id": faculty_id},
+        {"$set": {"availability_mask": encode_mask(to_mask(slots))}, "$unset": {"available_slots": ""}},
+    )
+    reference_data.mark_changed("faculties", faculty_id)
+    _forget_profile(faculty_id)
+    return res.matched_count > 0
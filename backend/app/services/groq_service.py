@@ -1,23 +1,147 @@
 # app/services/groq_service.py
+# Groq chat completions through one shared, pooled HTTP client.
+#
+# The client is opened in the app lifespan (start/stop) and keeps
+# connections alive between calls, over HTTP/2 when the h2 package is
+# installed. At most GROQ_MAX_CONCURRENCY calls are in flight upstream; the
+# rest wait, so a burst of /ai/query requests doesn't run into Groq's rate
+# limits. 429 and 5xx answers (and dropped connections) are retried with
+# exponential backoff, honouring Retry-After. GROQ_BASE_URL can point at a
+# local stub server for testing.
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+
 import httpx
 from app.config import settings
+from app.services import ai_cache, metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# backoff: BASE * 2^attempt, capped, plus up to 25% jitter
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+_client = None
+_limit = None
+_inflight = 0
+
+metrics.describe("groq_requests_total", "Groq calls, by final HTTP status (or 'error')")
+metrics.describe("groq_retries_total", "Groq calls retried after a 429/5xx or a connection error")
+metrics.describe("groq_request_seconds", "Groq call time including retries")
+metrics.describe("groq_inflight", "Groq calls currently upstream")
+
+
+class GroqError(Exception):
+    """The upstream call failed for good; status_code is Groq's (None if it never answered)."""
 
-async def query_groq(prompt: str) -> dict:
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _http2():
+    if not settings.GROQ_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.info("h2 is not installed, talking HTTP/1.1 to Groq")
+        return False
+    return True
+
+
+def start(transport=None):
     """
-    Async API call to Groq endpoint (replace URL with your real endpoint).
+    Open the shared client (app lifespan). `transport` replaces the network,
+    e.g. an httpx.MockTransport in tests.
     """
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    global _client, _limit
+    if _client is not None:
+        return _client
+    _client = httpx.AsyncClient(
+        base_url=settings.GROQ_BASE_URL,
+        http2=transport is None and _http2(),
+        transport=transport,
+        timeout=httpx.Timeout(settings.GROQ_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(max_connections=settings.GROQ_MAX_CONNECTIONS,
+                            max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS),
+        headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+    )
+    _limit = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+    return _client
 
-    headers = {
-        "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
+async def stop():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _backoff(attempt, response=None):
+    if response is not None:
+        try:
+            return min(BACKOFF_MAX, float(response.headers["retry-after"]))
+        except (KeyError, ValueError):
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return delay + random.uniform(0, delay / 4)
+
+
+async def chat_completion(payload: dict) -> dict:
+    """
+    POST /chat/completions with retries. Returns the decoded JSON answer;
+    raises GroqError when Groq keeps failing or rejects the request.
+    """
+    global _inflight
+    client = _client or start()  # outside the app (scripts), open on first use
+    start_time = time.perf_counter()
+    async with _limit:
+        _inflight += 1
+        metrics.set_gauge("groq_inflight", _inflight)
+        try:
+            for attempt in range(settings.GROQ_MAX_RETRIES + 1):
+                last = attempt == settings.GROQ_MAX_RETRIES
+                try:
+                    response = await client.post("/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    if last:
+                        metrics.inc("groq_requests_total", status="error")
+                        raise GroqError(f"Groq unreachable: {e!r}")
+                    metrics.inc("groq_retries_total")
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+
+                if response.status_code in RETRY_STATUSES and not last:
+                    metrics.inc("groq_retries_total")
+                    await asyncio.sleep(_backoff(attempt, response))
+                    continue
+
+                metrics.inc("groq_requests_total", status=str(response.status_code))
+                if response.is_error:
+                    raise GroqError(f"Groq answered {response.status_code}: {response.text[:200]}",
+                                    response.status_code, response.headers.get("retry-after"))
+                return response.json()
+        finally:
+            _inflight -= 1
+            metrics.set_gauge("groq_inflight", _inflight)
+            metrics.observe("groq_request_seconds", time.perf_counter() - start_time)
+
+
+async def query_groq(prompt: str, use_cache: bool = True):
+    """
+    Ask the configured model a single-message question. Returns (answer,
+    cached): identical questions are answered from ai_cache and concurrent
+    ones share one upstream call.
+    """
     payload = {
-        "model": "llama3-8b-8192",
+        "model": settings.GROQ_MODEL,
         "messages": [{"role": "user", "content": prompt}],
     }
-
-    async with httpx.AsyncClient(timeout=20) as client:
-        response = await client.post(url, json=payload, headers=headers)
-        return response.json()
+    if not use_cache:
+        return await chat_completion(payload), False
+    result, source = await ai_cache.get_or_call(payload, lambda: chat_completion(payload))
+    return result, source != "upstream"
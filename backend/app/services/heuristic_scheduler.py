@@ -0,0 +1,186 @@
+# app/services/heuristic_scheduler.py
+# Greedy DSATUR-style timetable constructor.
+#
+# Sessions are coloured with slots one at a time, always picking the session
+# with the fewest slots left (slots already taken by other sessions of its
+# batches), ties broken by the number of batch neighbours. For the chosen
+# session the least used slot that still has a free eligible faculty and a
+# free fitting room wins. This builds a feasible timetable in milliseconds
+# for inputs where CP-SAT needs seconds; in anytime mode its (possibly
+# partial) output is handed to CP-SAT as hints.
+import heapq
+import time
+
+from app.services.calendar_grid import TOTAL_SLOTS, to_slots
+from app.services.scheduler import (
+    ScheduleInputError,
+    make_entry,
+    precheck,
+    solve_schedule,
+)
+from app.services.solver_profiles import choose_profile
+
+
+def construct_schedule(subjects, faculties, rooms, batches):
+    """
+    Greedy construction. Returns {"status": "success", "schedule": [...]} or
+    {"status": "fail", "message": ..., "partial": [placed entries]}.
+    """
+    if not subjects or not faculties or not rooms or not batches:
+        return {"status": "fail", "message": "Missing data (subjects/faculty/rooms/batches)"}
+
+    try:
+        problems, (fac_masks, subj_faculty, subj_rooms) = precheck(subjects, faculties, rooms, batches)
+    except ScheduleInputError as e:
+        return {"status": "fail", "message": str(e), "reasons": e.reasons}
+    if problems:
+        return {"status": "fail", "message": "; ".join(problems), "reasons": problems}
+
+    max_load = [int(f.get("max_weekly_load", TOTAL_SLOTS)) for f in faculties]
+
+    # sessions, in the same order as the CP-SAT model
+    sessions = []
+    for subj in subjects:
+        for s in range(int(subj.get("weekly_sessions", 1))):
+            sessions.append((f"{str(subj.get('_id'))}_{s}", subj))
+
+    code_batches = {}
+    for b_idx, b in enumerate(batches):
+        for code in b.get("subjects", []):
+            code_batches.setdefault(code, []).append(b_idx)
+    batch_members = [[] for _ in batches]
+    for i, (_, subj) in enumerate(sessions):
+        for b_idx in code_batches.get(subj.get("code"), []):
+            batch_members[b_idx].append(i)
+
+    slot_options = []
+    for _, subj in sessions:
+        code = subj.get("code")
+        mask = 0
+        for f_idx in subj_faculty[code]:
+            mask |= fac_masks[f_idx]
+        slot_options.append(set(to_slots(mask)))
+    options_left = [len(opts) for opts in slot_options]
+    degree = [sum(len(batch_members[b_idx]) - 1 for b_idx in code_batches.get(subj.get("code"), []))
+              for _, subj in sessions]
+    blocked = [set() for _ in sessions]
+
+    fac_busy = [set() for _ in faculties]
+    room_busy = [set() for _ in rooms]
+    fac_load = [0] * len(faculties)
+    slot_use = [0] * TOTAL_SLOTS
+    # best fit: try small rooms first so big rooms stay free for big batches
+    room_order = {code: sorted(idxs, key=lambda r_idx: rooms[r_idx].get("capacity", 0))
+                  for code, idxs in subj_rooms.items()}
+
+    heap = [(options_left[i], -degree[i], i) for i in range(len(sessions))]
+    heapq.heapify(heap)
+    assigned = {}
+    unplaced = []
+
+    while heap:
+        left, _, i = heapq.heappop(heap)
+        if i in assigned or left != options_left[i]:
+            continue  # stale heap entry
+        session_id, subj = sessions[i]
+        code = subj.get("code")
+
+        placed = None
+        for slot in sorted(slot_options[i] - blocked[i], key=lambda t: (slot_use[t], t)):
+            fac_choices = [f_idx for f_idx in subj_faculty[code]
+                           if fac_masks[f_idx] >> slot & 1 and slot not in fac_busy[f_idx]
+                           and fac_load[f_idx] < max_load[f_idx]]
+            if not fac_choices:
+                continue
+            room_idx = next((r_idx for r_idx in room_order[code] if slot not in room_busy[r_idx]), None)
+            if room_idx is None:
+                continue
+            placed = (min(fac_choices, key=lambda f_idx: fac_load[f_idx]), room_idx, slot)
+            break
+
+        if placed is None:
+            unplaced.append(session_id)
+            assigned[i] = None
+            continue
+
+        f_idx, room_idx, slot = placed
+        assigned[i] = placed
+        fac_busy[f_idx].add(slot)
+        room_busy[room_idx].add(slot)
+        fac_load[f_idx] += 1
+        slot_use[slot] += 1
+
+        # raise the saturation of the batch neighbours
+        for b_idx in code_batches.get(code, []):
+            for j in batch_members[b_idx]:
+                if j in assigned or slot in blocked[j]:
+                    continue
+                blocked[j].add(slot)
+                if slot in slot_options[j]:
+                    options_left[j] -= 1
+                    heapq.heappush(heap, (options_left[j], -degree[j], j))
+
+    output = []
+    for i, (session_id, subj) in enumerate(sessions):
+        if assigned.get(i):
+            f_idx, room_idx, slot = assigned[i]
+            output.append(make_entry(session_id, subj, faculties[f_idx], rooms[room_idx], slot))
+
+    if unplaced:
+        return {
+            "status": "fail",
+            "message": f"Greedy construction could not place {len(unplaced)} session(s)",
+            "partial": output,
+        }
+    return {"status": "success", "schedule": output}
+
+
+def solve_heuristic(subjects, faculties, rooms, batches, stop_event=None, previous=None, pinned_ids=(), profile=None,
+                    progress=None):
+    """
+    Greedy only (mode="heuristic"). Same signature as solve_schedule so the
+    job runner can swap engines.
+    """
+    start = time.perf_counter()
+    result = construct_schedule(subjects, faculties, rooms, batches)
+    result.pop("partial", None)
+    result["engine"] = "heuristic"
+    result["telemetry"] = {"phases": {"construct": round(time.perf_counter() - start, 4)}}
+    if progress is not None and result["status"] == "success":
+        progress.put({"type": "solution", "elapsed": 0, "engine": "heuristic", "schedule": result["schedule"]})
+    return result
+
+
+def solve_anytime(subjects, faculties, rooms, batches, stop_event=None, previous=None, pinned_ids=(), profile=None,
+                  progress=None):
+    """
+    Greedy first (mode="anytime"); CP-SAT gets the rest of the time budget.
+
+    The CP-SAT model has no objective, so a complete greedy timetable is
+    already as good as CP-SAT's answer and is returned as is. When the greedy
+    pass gets stuck, its partial assignment seeds CP-SAT as hints.
+    """
+    start = time.monotonic()
+    greedy = construct_schedule(subjects, faculties, rooms, batches)
+    construct = round(time.monotonic() - start, 4)
+    if greedy["status"] == "success":
+        greedy["engine"] = "heuristic"
+        greedy["telemetry"] = {"phases": {"construct": construct}}
+        if progress is not None:
+            progress.put({"type": "solution", "elapsed": round(time.monotonic() - start, 3),
+                          "engine": "heuristic", "schedule": greedy["schedule"]})
+        return greedy
+    if "partial" not in greedy:
+        # input error (missing data, no eligible faculty/room): CP-SAT can't help
+        greedy["telemetry"] = {"phases": {"construct": construct}}
+        return greedy
+
+    profile = dict(profile or {})
+    budget = profile.get("time_limit") or choose_profile(sum(int(s.get("weekly_sessions", 1)) for s in subjects))["time_limit"]
+    profile["time_limit"] = max(1.0, budget - (time.monotonic() - start))
+    result = solve_schedule(subjects, faculties, rooms, batches, stop_event, greedy["partial"] or previous,
+                            pinned_ids, profile=profile, progress=progress)
+    result["engine"] = "heuristic+cp-sat"
+    if "telemetry" in result:
+        result["telemetry"]["phases"] = {"construct": construct, **result["telemetry"]["phases"]}
+    return result
@@ -0,0 +1,77 @@
+# app/services/indexes.py
+# Indexes of the reference collections, created at startup (see main.py).
+#
+# The unique indexes are what the services rely on to reject duplicates: the
+# create/update paths write straight away and turn a DuplicateKeyError into
+# their "already exists" answer instead of looking first. If stored data
+# already violates one (duplicates from before the index), creating it fails;
+# that is logged with the offending values and the app starts without it.
+import logging
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db import db
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "faculties": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        # "who can teach X" when building the model or checking a move
+        IndexModel([("subjects_can_teach", ASCENDING)], name="subjects_can_teach"),
+    ],
+    "subjects": [
+        IndexModel([("code", ASCENDING)], unique=True, name="code_unique"),
+    ],
+    "batches": [
+        IndexModel([("subjects", ASCENDING)], name="subjects"),
+    ],
+    "rooms": [
+        IndexModel([("capacity", ASCENDING)], name="capacity"),
+    ],
+    # /ai/query answers (ai_cache.py) are deleted once they expire
+    "ai_cache": [
+        IndexModel([("expire_after", ASCENDING)], expireAfterSeconds=0, name="expire_after_ttl"),
+    ],
+}
+
+
+async def _duplicates(collection, field, limit=5):
+    pipeline = [
+        {"$group": {"_id": f"${field}", "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [d["_id"] for d in await db[collection].aggregate(pipeline).to_list(None)]
+
+
+async def ensure_indexes():
+    """
+    Create the indexes above and check that the unique ones exist. Returns
+    the names of unique indexes that are missing (empty when all is well).
+    """
+    missing = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                doc = model.document
+                if doc.get("unique") and e.code == 11000:
+                    field = next(iter(doc["key"]))
+                    logger.error("Can't create unique index %s.%s, duplicate values: %s",
+                                 collection, field, await _duplicates(collection, field))
+                else:
+                    logger.error("Can't create index %s on %s: %s", doc["name"], collection, e)
+
+        # any unique index on the same key will do, whatever its name
+        unique_keys = [info["key"] for info in (await db[collection].index_information()).values()
+                       if info.get("unique")]
+        for model in models:
+            doc = model.document
+            if doc.get("unique") and list(doc["key"].items()) not in unique_keys:
+                missing.append(f"{collection}.{doc['name']}")
+    if missing:
+        logger.error("Unique indexes missing, duplicates won't be rejected: %s", ", ".join(missing))
+    return missing
@@ -0,0 +1,240 @@
+# app/services/interval_scheduler.py
+# Interval model for multi-slot sessions (mode="interval").
+#
+# The exact model gives every session one slot, so duration_minutes only
+# shows up in the "end" string and a 120 minute lab overlaps whatever sits
+# in the next slot. Here each session is an interval of
+# ceil(duration / SLOT_MINUTES) consecutive slots that starts and ends on
+# the same day. Clashes are posted as one NoOverlap per faculty and batch
+# over (optional) intervals, which CP-SAT propagates natively instead of
+# through combined-key AllDifferents.
+#
+# Rooms are not modelled one by one: rooms whose capacity lies between the
+# same two required sizes are interchangeable, so each such class gets one
+# Cumulative with its room count as capacity. For unit-demand intervals that
+# is exact (an interval graph with at most k overlapping sessions can always
+# be k-coloured), and concrete rooms are handed out after the solve.
+import bisect
+
+from ortools.sat.python import cp_model
+
+from app.services.calendar_grid import DAYS, SLOTS_PER_DAY, span_mask
+from app.services.scheduler import (
+    PhaseTimer,
+    ScheduleInputError,
+    enforce_if,
+    group_literal,
+    precheck,
+    session_length,
+    solve_schedule,
+    subject_required_sizes,
+)
+
+
+def day_starts(length):
+    """
+    Start slots from which `length` consecutive slots stay inside one day.
+    """
+    return [day * SLOTS_PER_DAY + k for day in range(DAYS) for k in range(SLOTS_PER_DAY - length + 1)]
+
+
+def _available_starts(mask, length):
+    # starts whose whole span is inside the faculty's availability mask
+    return [t for t in day_starts(length) if not span_mask(t, length) & ~mask]
+
+
+def room_classes(subjects, rooms, batches):
+    """
+    Group rooms that no subject can tell apart (no required size falls
+    between their capacities). Returns a list of room index lists, each
+    sorted by capacity.
+    """
+    thresholds = sorted(set(subject_required_sizes(subjects, batches).values()))
+    classes = {}
+    for r_idx, r in sorted(enumerate(rooms), key=lambda item: item[1].get("capacity", 0)):
+        classes.setdefault(bisect.bisect_right(thresholds, r.get("capacity", 0)), []).append(r_idx)
+    return [classes[key] for key in sorted(classes)]
+
+
+def spread_rooms(schedule, rooms, classes):
+    """
+    Replace each session's stand-in room by a concrete room of its class:
+    sessions in start order take the first room that is free again.
+    """
+    room_by_id = {str(r.get("_id")): r_idx for r_idx, r in enumerate(rooms)}
+    class_of = {r_idx: members for members in classes for r_idx in members}
+    by_class = {}
+    for entry in schedule:
+        members = class_of[room_by_id[entry["room_id"]]]
+        by_class.setdefault(members[0], (members, []))[1].append(entry)
+
+    for members, entries in by_class.values():
+        free_at = {r_idx: 0 for r_idx in members}
+        for entry in sorted(entries, key=lambda e: e["slot"]):
+            r_idx = next(r for r in members if free_at[r] <= entry["slot"])
+            free_at[r_idx] = entry["slot"] + entry.get("length", 1)
+            entry["room"] = rooms[r_idx].get("name")
+            entry["room_id"] = str(rooms[r_idx].get("_id"))
+    return schedule
+
+
+def _no_overlap(model, intervals, gate, capacity=1):
+    # Cumulative with the gate as demand switches off cleanly, NoOverlap does not
+    if gate is not None:
+        model.AddCumulative(intervals, [gate] * len(intervals), capacity)
+    elif capacity == 1:
+        model.AddNoOverlap(intervals)
+    else:
+        model.AddCumulative(intervals, [1] * len(intervals), capacity)
+
+
+def build_interval_model(subjects, faculties, rooms, batches, timer=None, groups=None):
+    """
+    Build the interval CP-SAT model. Same return value and session layout as
+    scheduler.build_model (slot_var is the first slot of the session), plus
+    "length" and "interval" per session. room_var picks the first room of a
+    room class; run spread_rooms on the output to get real rooms.
+
+    Raises ScheduleInputError when a session is longer than a day, no
+    eligible faculty has enough consecutive free slots for it, or precheck()
+    proves the input infeasible. `groups` works as in build_model.
+    """
+    timer = timer or PhaseTimer()
+    model = cp_model.CpModel()
+
+    problems, (fac_masks, subj_faculty, subj_rooms) = precheck(subjects, faculties, rooms, batches, multi_slot=True)
+    if problems:
+        raise ScheduleInputError("; ".join(problems), problems)
+    timer.lap("precheck")
+
+    classes = room_classes(subjects, rooms, batches)
+    stand_in = {r_idx: members[0] for members in classes for r_idx in members}
+    class_size = {members[0]: len(members) for members in classes}
+    starts_cache = {}
+
+    def starts_for(f_idx, length):
+        key = (f_idx, length)
+        if key not in starts_cache:
+            starts_cache[key] = _available_starts(fac_masks[f_idx], length)
+        return starts_cache[key]
+
+    timer.lap("precompute")
+
+    sessions = []
+    for subj in subjects:
+        code = subj.get("code")
+        length = session_length(subj)
+        if length > SLOTS_PER_DAY:
+            raise ScheduleInputError(
+                f"Subject {code} lasts {subj.get('duration_minutes')} minutes, longer than a day")
+
+        fac_options = [f_idx for f_idx in subj_faculty[code] if starts_for(f_idx, length)]
+        if not fac_options:
+            raise ScheduleInputError(f"No faculty with {length} consecutive free slots for subject {code}")
+        room_options = sorted({stand_in[r_idx] for r_idx in subj_rooms[code]})
+        if groups is not None:
+            # explaining: availability must be able to show up in the unsat core
+            slot_options = day_starts(length)
+        else:
+            slot_options = sorted(set().union(*(starts_for(f_idx, length) for f_idx in fac_options)))
+
+        for s in range(int(subj.get("weekly_sessions", 1))):
+            start = model.NewIntVarFromDomain(cp_model.Domain.FromValues(slot_options), f"start_{code}_{s}")
+            sessions.append({
+                "id": f"{str(subj.get('_id'))}_{s}",
+                "subject": subj,
+                "length": length,
+                "faculty_options": fac_options,
+                "room_options": room_options,
+                "room_alias": stand_in,
+                "faculty_var": model.NewIntVarFromDomain(cp_model.Domain.FromValues(fac_options), f"fac_{code}_{s}"),
+                "room_var": model.NewIntVarFromDomain(cp_model.Domain.FromValues(room_options), f"room_{code}_{s}"),
+                "slot_var": start,
+                "interval": model.NewFixedSizeIntervalVar(start, length, f"iv_{code}_{s}"),
+            })
+    timer.lap("variables")
+
+    # 1) Faculty: one optional interval per eligible faculty, exactly one present.
+    # A faculty's availability restricts the start while its interval is present.
+    fac_intervals = [[] for _ in faculties]
+    available_gate = {}
+    for i, ses in enumerate(sessions):
+        length = ses["length"]
+        lits = {}
+        for f_idx in ses["faculty_options"]:
+            lit = model.NewBoolVar(f"ses{i}_is_fac{f_idx}")
+            lits[f_idx] = lit
+            fac_intervals[f_idx].append(
+                model.NewOptionalFixedSizeIntervalVar(ses["slot_var"], length, lit, f"ses{i}_fac{f_idx}"))
+            allowed = starts_for(f_idx, length)
+            if len(allowed) < len(day_starts(length)):
+                if f_idx not in available_gate:
+                    available_gate[f_idx] = group_literal(
+                        model, groups, f"available_slots of faculty {faculties[f_idx].get('name')}")
+                enforce_if(model.AddLinearExpressionInDomain(ses["slot_var"], cp_model.Domain.FromValues(allowed)),
+                         lit, available_gate[f_idx])
+        model.AddExactlyOne(lits.values())
+        model.Add(ses["faculty_var"] == sum(f_idx * lit for f_idx, lit in lits.items()))
+        ses["faculty_lits"] = lits
+    timer.lap("c_faculty_eligibility")
+
+    gate = group_literal(model, groups, "faculty double booking")
+    for intervals in fac_intervals:
+        if len(intervals) > 1:
+            _no_overlap(model, intervals, gate)
+    timer.lap("c_faculty_clash")
+
+    # 2) Rooms: one optional interval per room class that fits, exactly one
+    # present; a class never hosts more sessions at once than it has rooms
+    class_intervals = {rep: [] for rep in class_size}
+    for i, ses in enumerate(sessions):
+        lits = {}
+        for rep in ses["room_options"]:
+            lit = model.NewBoolVar(f"ses{i}_in_class{rep}")
+            lits[rep] = lit
+            class_intervals[rep].append(
+                model.NewOptionalFixedSizeIntervalVar(ses["slot_var"], ses["length"], lit, f"ses{i}_class{rep}"))
+        model.AddExactlyOne(lits.values())
+        model.Add(ses["room_var"] == sum(rep * lit for rep, lit in lits.items()))
+    gate = group_literal(model, groups, "room double booking")
+    for rep, intervals in class_intervals.items():
+        if len(intervals) > class_size[rep]:
+            _no_overlap(model, intervals, gate, class_size[rep])
+    timer.lap("c_room_clash")
+
+    # 3) Batches: the sessions a batch attends never overlap
+    for batch in batches:
+        subj_codes = set(batch.get("subjects", []))
+        intervals = [ses["interval"] for ses in sessions if ses["subject"].get("code") in subj_codes]
+        if len(intervals) > 1:
+            _no_overlap(model, intervals,
+                        group_literal(model, groups, f"one session at a time for batch {batch.get('name')}"))
+    timer.lap("c_batch_clash")
+
+    # 4) Faculty max weekly load, counted in sessions like the exact model
+    fac_lits = [[] for _ in faculties]
+    for ses in sessions:
+        for f_idx, lit in ses["faculty_lits"].items():
+            fac_lits[f_idx].append(lit)
+    for f_idx, f in enumerate(faculties):
+        max_load = int(f.get("max_weekly_load", len(sessions)))
+        if len(fac_lits[f_idx]) > max_load:
+            enforce_if(model.Add(sum(fac_lits[f_idx]) <= max_load),
+                     group_literal(model, groups, f"max_weekly_load of faculty {f.get('name')}"))
+    timer.lap("c_faculty_load")
+
+    return model, sessions
+
+
+def solve_intervals(subjects, faculties, rooms, batches, stop_event=None, previous=None, pinned_ids=(), profile=None,
+                    progress=None):
+    """
+    solve_schedule on the interval model. Output entries of multi-slot
+    sessions carry "length" (slots occupied from "slot" on).
+    """
+    classes = room_classes(subjects, rooms, batches)
+    result = solve_schedule(subjects, faculties, rooms, batches, stop_event, previous, pinned_ids, profile,
+                            progress=progress, builder=build_interval_model,
+                            finalize=lambda schedule: spread_rooms(schedule, rooms, classes))
+    result["engine"] = "interval"
+    return result
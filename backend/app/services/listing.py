@@ -0,0 +1,74 @@
+# app/services/listing.py
+# Keyset pagination and streamed output for the /all endpoints.
+#
+# Lists are ordered by _id. A page is `limit` documents with _id greater than
+# `after` (the id of the last item of the previous page); a full page sends
+# the id to continue from in the X-Next-After header. Without a limit the
+# whole collection is streamed as the Motor cursor yields it, as a JSON array
+# or, with format=ndjson, one JSON document per line, so neither memory nor
+# time to first byte grows with the collection.
+from typing import Literal
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+
+MAX_LIMIT = 1000
+# documents fetched per round trip while streaming
+BATCH_SIZE = 500
+
+
+def list_params(
+    limit: int | None = Query(None, ge=1, le=MAX_LIMIT),
+    after: str | None = Query(None, description="id of the last item of the previous page"),
+    format: Literal["json", "ndjson"] = "json",
+):
+    return {"limit": limit, "after": after, "format": format}
+
+
+def page_cursor(col, limit=None, after=None, id_type=ObjectId, projection=None):
+    """
+    Cursor over `col` in _id order, starting after `after`. `id_type` turns
+    the id from the query string into the stored _id type.
+    """
+    query = {}
+    if after is not None:
+        try:
+            query["_id"] = {"$gt": id_type(after)}
+        except (InvalidId, TypeError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Invalid after id {after!r}")
+    cursor = col.find(query, projection).sort("_id", 1).batch_size(BATCH_SIZE)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+async def _json_array(cursor, serialize):
+    yield "["
+    first = True
+    async for doc in cursor:
+        yield serialize(doc) if first else "," + serialize(doc)
+        first = False
+    yield "]"
+
+
+async def _ndjson(cursor, serialize):
+    async for doc in cursor:
+        yield serialize(doc) + "\n"
+
+
+async def list_response(cursor, serialize, limit=None, format="json"):
+    """
+    Response for an /all endpoint. `serialize` turns a document into a JSON
+    string (it may modify the document).
+    """
+    if format == "ndjson":
+        return StreamingResponse(_ndjson(cursor, serialize), media_type="application/x-ndjson")
+    if limit is None:
+        return StreamingResponse(_json_array(cursor, serialize), media_type="application/json")
+
+    docs = await cursor.to_list(limit)
+    headers = {"X-Next-After": str(docs[-1]["_id"])} if len(docs) == limit else {}
+    return Response("[" + ",".join(serialize(d) for d in docs) + "]", media_type="application/json",
+                    headers=headers)
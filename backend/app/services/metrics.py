@@ -0,0 +1,75 @@
+# app/services/metrics.py
+# Minimal in-process metrics registry with Prometheus text exposition
+# (counters, gauges and count/sum/max summaries; no extra dependency).
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_summaries = {}
+_help = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    with _lock:
+        key = _key(name, labels)
+        count, total, high = _summaries.get(key, (0, 0.0, value))
+        _summaries[key] = (count + 1, total + value, max(high, value))
+
+
+def _fmt_labels(labels):
+    pairs = list(labels)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render() -> str:
+    """
+    Prometheus text format.
+    """
+    lines = []
+    with _lock:
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in _help:
+                    lines.append(f"# HELP {name} {_help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(_counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        for (name, labels), value in sorted(_gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        for (name, labels), (count, total, high) in sorted(_summaries.items()):
+            header(name, "summary")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+        # the max is not part of the summary type, expose it as its own gauge
+        for (name, labels), (count, total, high) in sorted(_summaries.items()):
+            header(f"{name}_max", "gauge")
+            lines.append(f"{name}_max{_fmt_labels(labels)} {high}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+# app/services/occupancy.py
+# Occupancy index over a stored schedule, for manual edits.
+#
+# Each faculty, room and batch gets an int used as a bitset over TOTAL_SLOTS
+# (bit t set = busy in slot t), and each faculty a count of its sessions for
+# max_weekly_load, so checking "move session X to slot/room Y" is a handful
+# of AND operations instead of a re-solve. Indexes are built
+# per version on first use and kept in memory; moves are checked and applied
+# to the index synchronously on the event loop and then written through to
+# the stored version under a per-version lock, so concurrent edits can't
+# interleave.
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from app.services import reference_data, schedule_cache, schedule_store
+from app.services.calendar_grid import SLOTS_PER_DAY, TOTAL_SLOTS, availability_mask, slot_to_time, span_mask
+from app.services.scheduler import subject_required_sizes
+
+# indexes kept in memory, and how long before one is rebuilt anyway; input
+# changes made through the services rebuild it right away
+MAX_INDEXES = 4
+INDEX_TTL = 60.0
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_indexes = OrderedDict()  # version -> OccupancyIndex
+_locks = {}  # version -> [lock, edits using it]; dropped when the last one ends
+
+
+class OccupancyIndex:
+    """
+    Bitsets of one schedule version. `faculties`/`rooms`/`batches`/`subjects`
+    are the documents as stored in Mongo.
+    """
+
+    def __init__(self, version, schedule, faculties, rooms, batches, subjects):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.generation = None  # reference_data.generation() of the inputs
+        self.entries = {entry["id"]: entry for entry in schedule}
+        self.faculties = {str(f.get("_id")): f for f in faculties}
+        self.rooms = {str(r.get("_id")): r for r in rooms}
+        self.required = subject_required_sizes(subjects, batches)
+
+        self.available = {f_id: availability_mask(f) for f_id, f in self.faculties.items()}
+
+        self.batch_names = {str(b.get("_id")): b.get("name") for b in batches}
+        self.attending = {}
+        for b in batches:
+            for code in b.get("subjects", []):
+                self.attending.setdefault(code, []).append(str(b.get("_id")))
+
+        # (kind, id) -> bitset, and (kind, id, slot) -> session id for messages
+        self.busy = {}
+        self.owner = {}
+        # faculty id -> sessions taught (max_weekly_load counts sessions, like the engines)
+        self.load = {}
+        for entry in schedule:
+            self._mark(entry, add=True)
+
+    def _resources(self, entry):
+        yield "faculty", entry["faculty_id"]
+        yield "room", entry["room_id"]
+        for b_id in self.attending.get(entry.get("subject_code"), []):
+            yield "batch", b_id
+
+    def _label(self, key):
+        kind, key_id = key
+        if kind == "batch":
+            name = self.batch_names.get(key_id)
+        else:
+            name = (self.faculties if kind == "faculty" else self.rooms).get(key_id, {}).get("name")
+        return name or key_id
+
+    def _mark(self, entry, add):
+        length = entry.get("length", 1)
+        mask = span_mask(entry["slot"], length)
+        self.load[entry["faculty_id"]] = self.load.get(entry["faculty_id"], 0) + (1 if add else -1)
+        for key in self._resources(entry):
+            if add:
+                self.busy[key] = self.busy.get(key, 0) | mask
+            else:
+                self.busy[key] = self.busy.get(key, 0) & ~mask
+            for t in range(entry["slot"], entry["slot"] + length):
+                if add:
+                    self.owner[key + (t,)] = entry["id"]
+                else:
+                    self.owner.pop(key + (t,), None)
+
+    def _moved(self, entry, slot=None, room_id=None, faculty_id=None):
+        moved = dict(entry)
+        if slot is not None and slot != entry["slot"]:
+            start = slot_to_time(slot)
+            duration = datetime.strptime(entry["end"], TIME_FORMAT) - datetime.strptime(entry["start"], TIME_FORMAT)
+            moved.update(slot=slot, start=start.strftime(TIME_FORMAT), end=(start + duration).strftime(TIME_FORMAT))
+        if room_id is not None:
+            moved.update(room_id=room_id, room=self.rooms[room_id].get("name") if room_id in self.rooms else None)
+        if faculty_id is not None:
+            moved.update(faculty_id=faculty_id,
+                         faculty=self.faculties[faculty_id].get("name") if faculty_id in self.faculties else None)
+        return moved
+
+    def check(self, session_id, slot=None, room_id=None, faculty_id=None):
+        """
+        Conflicts the move would cause, as (moved entry, list of messages).
+        Raises KeyError for an unknown session.
+        """
+        entry = self.entries[session_id]
+        length = entry.get("length", 1)
+        target = entry["slot"] if slot is None else slot
+        if not 0 <= target < TOTAL_SLOTS or target % SLOTS_PER_DAY + length > SLOTS_PER_DAY:
+            # before _moved: times of a slot far off the grid don't even fit a datetime
+            return dict(entry, slot=target), [
+                f"Slot {target} is outside the week or the session would cross a day boundary"]
+
+        moved = self._moved(entry, slot, room_id, faculty_id)
+        conflicts = []
+
+        faculty = self.faculties.get(moved["faculty_id"])
+        room = self.rooms.get(moved["room_id"])
+        if faculty is None:
+            conflicts.append(f"Unknown faculty {moved['faculty_id']}")
+        if room is None:
+            conflicts.append(f"Unknown room {moved['room_id']}")
+        if conflicts:
+            return moved, conflicts
+
+        code = moved.get("subject_code")
+        mask = span_mask(moved["slot"], length)
+        if code not in faculty.get("subjects_can_teach", []):
+            conflicts.append(f"Faculty {faculty.get('name')} can't teach {code}")
+        if mask & ~self.available[moved["faculty_id"]]:
+            conflicts.append(f"Faculty {faculty.get('name')} is not available in slot {moved['slot']}")
+        if moved["faculty_id"] != entry["faculty_id"]:
+            max_load = faculty.get("max_weekly_load")
+            if max_load is not None and self.load.get(moved["faculty_id"], 0) + 1 > int(max_load):
+                conflicts.append(f"Faculty {faculty.get('name')} already teaches {self.load.get(moved['faculty_id'], 0)} "
+                                 f"sessions a week (max_weekly_load {max_load})")
+        need = self.required.get(code, 0)
+        if room.get("capacity", 0) < need:
+            conflicts.append(f"Room {room.get('name')} holds {room.get('capacity', 0)}, {code} needs {need}")
+
+        own = span_mask(entry["slot"], entry.get("length", 1))
+        own_keys = set(self._resources(entry))
+        for key in self._resources(moved):
+            busy = self.busy.get(key, 0)
+            if key in own_keys:
+                busy &= ~own
+            clash = busy & mask
+            if clash:
+                t = (clash & -clash).bit_length() - 1
+                other = self.owner.get(key + (t,))
+                conflicts.append(f"{key[0].capitalize()} {self._label(key)} is busy in slot {t} (session {other})")
+        return moved, conflicts
+
+    def apply(self, moved):
+        old = self.entries[moved["id"]]
+        self._mark(old, add=False)
+        self._mark(moved, add=True)
+        self.entries[moved["id"]] = moved
+        return old
+
+
+async def get_index(version: int):
+    """
+    Occupancy index of a stored version (None if the version doesn't exist).
+    """
+    index = _indexes.get(version)
+    if (index is not None and index.generation == reference_data.generation()
+            and time.monotonic() - index.built_at < INDEX_TTL):
+        _indexes.move_to_end(version)
+        return index
+
+    doc = await schedule_store.get_schedule(version)
+    if not doc:
+        return None
+    generation = reference_data.generation()
+    subjects, faculties, rooms, batches = await reference_data.get_inputs()
+    index = OccupancyIndex(version, doc["schedule"], faculties, rooms, batches, subjects)
+    index.generation = generation
+    _indexes[version] = index
+    _indexes.move_to_end(version)
+    while len(_indexes) > MAX_INDEXES:
+        _indexes.popitem(last=False)
+    return index
+
+
+def clear():
+    _indexes.clear()
+
+
+async def move_session(version: int, session_id: str, slot=None, room_id=None, faculty_id=None):
+    """
+    Check a move and, if it is conflict free, apply it to the index and the
+    stored version. Returns (entry, conflicts): the moved entry when applied,
+    the list of conflicts otherwise. Raises KeyError for an unknown session.
+    """
+    holder = _locks.setdefault(version, [asyncio.Lock(), 0])
+    holder[1] += 1
+    try:
+        async with holder[0]:
+            return await _move_locked(version, session_id, slot, room_id, faculty_id)
+    finally:
+        holder[1] -= 1
+        if not holder[1]:
+            del _locks[version]
+
+
+async def _move_locked(version, session_id, slot, room_id, faculty_id):
+    index = await get_index(version)
+    if index is None:
+        raise KeyError(version)
+    moved, conflicts = index.check(session_id, slot, room_id, faculty_id)
+    if conflicts:
+        return moved, conflicts
+    old = index.apply(moved)
+    try:
+        await schedule_store.update_entry(version, moved)
+    except Exception:
+        index.apply(old)
+        raise
+    # cached solver results may point at this version's old content
+    await schedule_cache.drop_version(version)
+    return moved, []
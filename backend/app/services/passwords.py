@@ -0,0 +1,129 @@
+# app/services/passwords.py
+# Password hashing off the event loop.
+#
+# bcrypt costs 100-300 ms of CPU per call on purpose; run inline it stalls
+# every request on the loop for that long. All hashing and verification
+# goes through a small thread pool instead (bcrypt releases the GIL), at
+# most PASSWORD_HASH_WORKERS at a time. Callers beyond that wait in line;
+# past PASSWORD_MAX_QUEUE waiting calls new ones are turned away with
+# PasswordBusy so a login storm can't queue up unbounded latency.
+#
+# Hashes record their cost factor. When BCRYPT_ROUNDS changes, a successful
+# login returns a fresh hash (verify_and_update) for the caller to store.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.config import settings
+from app.services import metrics
+
+_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = None  # asyncio.Semaphore, created on the running loop
+_waiting = 0
+
+metrics.describe("password_queue_depth", "Password hash/verify calls waiting for a worker")
+metrics.describe("password_queue_wait_seconds", "Time password calls waited for a worker")
+metrics.describe("password_work_seconds", "bcrypt time per call, by operation")
+metrics.describe("password_rejected_total", "Password calls turned away because the queue was full")
+metrics.describe("password_rehashed_total", "Hashes upgraded to the current cost factor on login")
+
+
+class PasswordBusy(Exception):
+    """Raised when too many password calls are waiting; retry_after is in seconds."""
+
+    def __init__(self, retry_after=1):
+        super().__init__(f"Too many logins at once, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _secret(password):
+    # bcrypt only looks at the first 72 bytes (and bcrypt>=4.1 refuses more)
+    return str(password).encode("utf-8")[:72]
+
+
+def _hash(password):
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode()
+
+
+def _verify(password, hashed):
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode())
+    except (ValueError, AttributeError):  # not a bcrypt hash
+        return False
+
+
+def rounds_of(hashed):
+    # "$2b$12$<salt+checksum>" -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+async def _run(operation, fn, *args, reject=True):
+    global _slots, _waiting
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+    if reject and _slots.locked() and _waiting >= settings.PASSWORD_MAX_QUEUE:
+        metrics.inc("password_rejected_total")
+        raise PasswordBusy()
+
+    loop = asyncio.get_running_loop()
+    queued = loop.time()
+    _waiting += 1
+    metrics.set_gauge("password_queue_depth", _waiting)
+    try:
+        await _slots.acquire()
+    finally:
+        _waiting -= 1
+        metrics.set_gauge("password_queue_depth", _waiting)
+    metrics.observe("password_queue_wait_seconds", loop.time() - queued)
+    try:
+        start = time.perf_counter()
+        result = await loop.run_in_executor(_pool, fn, *args)
+        metrics.observe("password_work_seconds", time.perf_counter() - start, operation=operation)
+        return result
+    finally:
+        _slots.release()
+
+
+async def hash_password(password):
+    return await _run("hash", _hash, password)
+
+
+async def hash_passwords(passwords):
+    """
+    Hash many passwords (bulk import). At most one call per worker is in
+    line at a time, so logins arriving meanwhile still get their turn, and
+    the import is never turned away.
+    """
+    limit = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+    async def one(password):
+        async with limit:
+            return await _run("hash", _hash, password, reject=False)
+
+    return await asyncio.gather(*(one(p) for p in passwords))
+
+
+async def verify_password(password, hashed):
+    return await _run("verify", _verify, password, hashed)
+
+
+async def verify_and_update(password, hashed):
+    """
+    (ok, new_hash): new_hash is a rehash at the current BCRYPT_ROUNDS when
+    the password is right but `hashed` used another cost factor, else None.
+    """
+    if not await verify_password(password, hashed):
+        return False, None
+    if rounds_of(hashed) == settings.BCRYPT_ROUNDS:
+        return True, None
+    metrics.inc("password_rehashed_total")
+    return True, await hash_password(password)
+
+
+def shutdown():
+    _pool.shutdown(wait=False, cancel_futures=True)
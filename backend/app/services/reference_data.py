@@ -0,0 +1,141 @@
+# app/services/reference_data.py
+# In-process snapshot of the scheduling inputs (subjects, faculties, rooms,
+# batches).
+#
+# The four collections are loaded concurrently, with only the fields the
+# schedulers read (no password hashes), and kept in memory. The services
+# that write them call mark_changed() with the ids they touched; the next
+# read refetches just those documents. Writes made by other processes are
+# picked up from a Mongo change stream when the server has one (replica
+# sets), and otherwise by reloading the snapshot after REFERENCE_SNAPSHOT_TTL.
+#
+# Documents handed out are shared with the snapshot: treat them as read-only.
+import asyncio
+import logging
+import time
+
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db import db
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# collection -> fields the schedulers use (_id always comes along)
+PROJECTIONS = {
+    "subjects": ["code", "name", "weekly_sessions", "duration_minutes"],
+    "faculties": ["name", "subjects_can_teach", "max_weekly_load", "availability_mask", "available_slots"],
+    "rooms": ["name", "capacity"],
+    "batches": ["name", "student_count", "subjects", "subject_ids"],
+}
+
+_docs = None        # collection -> {_id: document}, None until loaded
+_loaded_at = 0.0
+_dirty = {name: set() for name in PROJECTIONS}
+_reload = False     # a change we couldn't pin to ids
+_generation = 0     # bumped on every change, see generation()
+_lock = asyncio.Lock()
+
+metrics.describe("reference_snapshot_reads_total", "Scheduling input reads, by how they were served")
+metrics.describe("reference_snapshot_fetch_seconds", "Time spent fetching scheduling inputs from Mongo")
+
+
+def _projection(collection):
+    return {field: 1 for field in PROJECTIONS[collection]}
+
+
+def mark_changed(collection, *ids):
+    """
+    Note that documents of `collection` were created, updated or deleted.
+    Without ids the whole snapshot is reloaded on the next read.
+    """
+    global _generation, _reload
+    if collection not in PROJECTIONS:
+        return
+    _generation += 1
+    if ids:
+        _dirty[collection].update(ids)
+    else:
+        _reload = True
+
+
+def generation():
+    """
+    Counter that changes whenever the inputs may have changed; lets derived
+    caches (e.g. occupancy indexes) notice they are stale.
+    """
+    return _generation
+
+
+async def _fetch_all():
+    names = list(PROJECTIONS)
+    found = await asyncio.gather(*(db[name].find({}, _projection(name)).to_list(None) for name in names))
+    return {name: {d["_id"]: d for d in docs} for name, docs in zip(names, found)}
+
+
+async def _refresh(collection, ids):
+    found = await db[collection].find({"_id": {"$in": list(ids)}}, _projection(collection)).to_list(None)
+    docs = _docs[collection]
+    for _id in ids:
+        docs.pop(_id, None)
+    for d in found:
+        docs[d["_id"]] = d
+
+
+async def get_inputs():
+    """
+    (subjects, faculties, rooms, batches) as lists of projected documents.
+    """
+    global _docs, _loaded_at, _reload
+    async with _lock:
+        start = time.perf_counter()
+        expired = time.monotonic() - _loaded_at > settings.REFERENCE_SNAPSHOT_TTL
+        if _docs is None or _reload or expired:
+            _reload = False
+            for ids in _dirty.values():
+                ids.clear()
+            try:
+                _docs = await _fetch_all()
+            except BaseException:
+                _reload = True
+                raise
+            _loaded_at = time.monotonic()
+            served = "full"
+        elif any(_dirty.values()):
+            pending = {name: set(ids) for name, ids in _dirty.items() if ids}
+            for ids in _dirty.values():
+                ids.clear()
+            try:
+                await asyncio.gather(*(_refresh(name, ids) for name, ids in pending.items()))
+            except BaseException:
+                for name, ids in pending.items():
+                    _dirty[name].update(ids)
+                raise
+            served = "partial"
+        else:
+            served = "hit"
+        if served != "hit":
+            metrics.observe("reference_snapshot_fetch_seconds", time.perf_counter() - start)
+        metrics.inc("reference_snapshot_reads_total", served=served)
+        return tuple(list(_docs[name].values()) for name in PROJECTIONS)
+
+
+async def watch_changes():
+    """
+    Follow inserts/updates/deletes on the input collections through a change
+    stream. Returns quietly when the server doesn't support change streams
+    (standalone mongod); the TTL reload covers that case.
+    """
+    pipeline = [{"$match": {"ns.coll": {"$in": list(PROJECTIONS)}}}]
+    try:
+        async with db.watch(pipeline) as stream:
+            logger.info("Following scheduling input changes through a change stream")
+            async for change in stream:
+                collection = change["ns"]["coll"]
+                if "documentKey" in change:
+                    mark_changed(collection, change["documentKey"]["_id"])
+                else:  # drop / rename
+                    mark_changed(collection)
+    except PyMongoError as e:
+        logger.info("No change stream for scheduling inputs (%s); relying on the snapshot TTL", e)
@@ -1,17 +1,26 @@
 # app/services/room_service.py
 
 from app.db import db
+from app.models.room import RoomCreate, RoomOut
+from app.services import bulk_import, reference_data
+from app.services.listing import page_cursor
 
 room_col = db["rooms"]
 
 async def add_room_service(data):
     room_dict = data.dict()
     result = await room_col.insert_one(room_dict)
+    reference_data.mark_changed("rooms", result.inserted_id)
     return str(result.inserted_id)
 
-async def get_all_rooms_service():
-    rooms = await room_col.find().to_list(None)
-    return rooms
+async def bulk_add_rooms_service(rows):
+    return await bulk_import.import_rows(room_col, RoomCreate, rows)
+
+def find_rooms_service(limit=None, after=None):
+    return page_cursor(room_col, limit, after)
+
+def room_json(room):
+    return RoomOut(id=str(room.pop("_id")), **room).model_dump_json()
 
 async def get_room_service(room_id):
     from bson import ObjectId
@@ -21,9 +30,11 @@ async def update_room_service(room_id, data):
     from bson import ObjectId
     update_data = {k: v for k, v in data.dict().items() if v is not None}
     await room_col.update_one({"_id": ObjectId(room_id)}, {"$set": update_data})
+    reference_data.mark_changed("rooms", ObjectId(room_id))
     return True
 
 async def delete_room_service(room_id):
     from bson import ObjectId
     await room_col.delete_one({"_id": ObjectId(room_id)})
+    reference_data.mark_changed("rooms", ObjectId(room_id))
     return True
@@ -0,0 +1,76 @@
+# app/services/schedule_cache.py
+# Content-addressed cache of solved schedules.
+#
+# The key is a hash of the whole input snapshot (per-document fingerprints of
+# subjects/faculties/rooms/batches) plus the solver options, so an unchanged
+# institution never pays for a second solve. Two tiers: a small in-process
+# LRU and a Mongo collection that survives restarts, both size bounded.
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from app.config import settings
+from app.db import db
+
+cache_col = db["schedule_cache"]
+
+_memory = OrderedDict()
+
+
+def snapshot_key(fingerprints: dict, options: dict) -> str:
+    raw = json.dumps({"inputs": fingerprints, "options": options}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _remember(key, result):
+    _memory[key] = result
+    _memory.move_to_end(key)
+    while len(_memory) > settings.SCHEDULE_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+async def get_cached(key: str):
+    """
+    Cached result for `key`, or None. Memory first, then Mongo.
+    """
+    if key in _memory:
+        _memory.move_to_end(key)
+        return _memory[key]
+
+    doc = await cache_col.find_one_and_update(
+        {"_id": key}, {"$set": {"last_used": time.time()}}, projection={"result": 1}
+    )
+    if not doc:
+        return None
+    _remember(key, doc["result"])
+    return doc["result"]
+
+
+async def put_cached(key: str, result: dict):
+    _remember(key, result)
+    now = time.time()
+    await cache_col.replace_one(
+        {"_id": key},
+        {"result": result, "created_at": now, "last_used": now},
+        upsert=True,
+    )
+
+    # LRU eviction of the persistent tier
+    extra = await cache_col.count_documents({}) - settings.SCHEDULE_CACHE_DB_SIZE
+    if extra > 0:
+        stale = await cache_col.find({}, {"_id": 1}).sort("last_used", 1).limit(extra).to_list(None)
+        await cache_col.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+
+
+async def drop_version(version: int):
+    """
+    Forget cached results that point at a schedule version (it was edited).
+    """
+    for key in [k for k, result in _memory.items() if result.get("version") == version]:
+        del _memory[key]
+    await cache_col.delete_many({"result.version": version})
+
+
+def clear_memory():
+    _memory.clear()
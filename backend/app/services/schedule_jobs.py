@@ -0,0 +1,371 @@
+# app/services/schedule_jobs.py
+# Background schedule generation: solves run in a process pool so the
+# event loop stays free for logins/CRUD/AI while CP-SAT is searching.
+import asyncio
+import multiprocessing
+from queue import Empty
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import settings
+from app.services import metrics, schedule_cache, schedule_store, solver_capacity
+from app.services.decomposition import solve_decomposed
+from app.services.heuristic_scheduler import solve_anytime, solve_heuristic
+from app.services.interval_scheduler import solve_intervals
+from app.services.scheduler import solve_schedule
+from app.services.solver_capacity import SchedulerBusy
+from app.services.solver_profiles import choose_profile
+
+# mode -> solve function (all share solve_schedule's signature)
+ENGINES = {
+    "exact": solve_schedule,
+    "heuristic": solve_heuristic,
+    "anytime": solve_anytime,
+    "interval": solve_intervals,
+}
+
+# keep finished jobs around for polling, but not forever
+MAX_FINISHED_JOBS = 200
+
+_executor = None
+_manager = None
+jobs = {}
+# snapshot cache key -> id of the job currently solving it
+_inflight = {}
+
+metrics.describe("schedule_jobs_total", "Finished schedule jobs by status and mode")
+metrics.describe("schedule_job_seconds", "Schedule job wall time from submit to finish")
+metrics.describe("schedule_phase_seconds", "Time per scheduler phase")
+metrics.describe("schedule_cache_hits_total", "Jobs answered from the snapshot cache")
+metrics.describe("schedule_model_variables", "CP-SAT variables in the last model")
+metrics.describe("schedule_model_constraints", "CP-SAT constraints in the last model")
+metrics.describe("schedule_model_sessions", "Sessions in the last model")
+metrics.describe("schedule_solver_conflicts", "CP-SAT conflicts per solve")
+metrics.describe("schedule_solver_branches", "CP-SAT branches per solve")
+metrics.describe("schedule_solver_wall_seconds", "CP-SAT wall time per solve")
+
+
+def _get_executor():
+    global _executor, _manager
+    if _executor is None:
+        # spawn (not fork): the parent runs an event loop and motor threads
+        ctx = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(max_workers=settings.SCHEDULER_WORKERS, mp_context=ctx)
+        try:
+            manager = ctx.Manager()
+        except BaseException:
+            # leave nothing half set up: the next job tries again
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        _executor, _manager = executor, manager
+    return _executor, _manager
+
+
+def _public(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "queue_position": solver_capacity.queue_position(job["id"]) if job["status"] == "queued" else None,
+        "result": job["result"],
+    }
+
+
+def _publish(job, event):
+    # record the event and wake up every stream waiting on this job
+    job["events"].append(event)
+    job["wakeup"].set()
+    job["wakeup"] = asyncio.Event()
+
+
+async def _pump_progress(job, queue):
+    """
+    Forward events the worker puts on the manager queue into the job's
+    event log, until the solve finishes.
+    """
+    while True:
+        try:
+            event = await asyncio.to_thread(queue.get, True, 0.25)
+        except Empty:
+            if job["future"].done():
+                return
+            continue
+        except (EOFError, OSError):
+            return  # manager went away (shutdown)
+        _publish(job, event)
+
+
+def _prune_finished():
+    finished = [j for j in jobs.values() if j["finished_at"] is not None]
+    if len(finished) <= MAX_FINISHED_JOBS:
+        return
+    finished.sort(key=lambda j: j["finished_at"])
+    for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+        jobs.pop(job["id"], None)
+
+
+async def _solve(job, subjects, faculties, rooms, batches, options):
+    """
+    Runs in a task on the event loop; the actual solve happens in the pool.
+    """
+    fingerprints = job["fingerprints"]
+
+    if options["use_cache"]:
+        cached = await schedule_cache.get_cached(job["cache_key"])
+        if cached is not None:
+            # the stored telemetry describes the original solve, not this request
+            return dict(cached, cached=True, telemetry={"phases": {}})
+
+    previous, pinned_ids = None, set()
+    if options["warm_start"] or options["pin_unaffected"]:
+        latest = await schedule_store.get_latest_schedule()
+        if latest:
+            previous = latest["schedule"]
+            if options["pin_unaffected"]:
+                pinned_ids = schedule_store.unaffected_session_ids(latest, subjects, faculties, batches, fingerprints)
+
+    if job["status"] == "cancelled":
+        return {"status": "cancelled", "message": "Schedule generation was cancelled"}
+
+    # wait for a solver slot; the job runs with the threads it is granted
+    n_sessions = sum(int(s.get("weekly_sessions", 1)) for s in subjects)
+    wanted = 1 if options["mode"] == "heuristic" else choose_profile(n_sessions, options["solver"])["num_workers"]
+    queued = time.perf_counter()
+    job["threads"] = await solver_capacity.acquire(job["id"], wanted, options["priority"])
+    admitted = time.perf_counter()
+    job["queue_seconds"] = round(admitted - queued, 4)
+    try:
+        executor, manager = _get_executor()
+        job["stop_event"] = manager.Event()
+        progress = manager.Queue()
+        solve = ENGINES[options["mode"]]
+        if options["mode"] == "exact" and options["decompose"]:
+            solve = solve_decomposed
+        profile = dict(options["solver"], num_workers=job["threads"])
+        job["future"] = executor.submit(solve, subjects, faculties, rooms, batches, job["stop_event"], previous,
+                                        pinned_ids, profile=profile, progress=progress)
+        # the slot guarantees a free pool process, so the solve starts now
+        if job["status"] == "queued":
+            job["status"] = "running"
+        job["started_at"] = time.time()
+        pump = asyncio.create_task(_pump_progress(job, progress))
+        try:
+            result = await asyncio.wrap_future(job["future"])
+        finally:
+            await pump
+    finally:
+        solver_capacity.release(job["id"], time.perf_counter() - admitted)
+
+    if result.get("status") == "success" and job["status"] != "cancelled":
+        result["version"] = await schedule_store.save_schedule(result, fingerprints, batches)
+        if options["use_cache"]:
+            await schedule_cache.put_cached(job["cache_key"], result)
+    return result
+
+
+def _add_job_telemetry(job, result):
+    """
+    Complete the solver's telemetry with job-level phases and export it
+    as metrics.
+    """
+    telemetry = result.setdefault("telemetry", {"phases": {}})
+    solver_phases = sum(telemetry["phases"].values())
+    wall = job["finished_at"] - job["created_at"]
+    telemetry["phases"] = {
+        "data_fetch": job["fetch_seconds"],
+        "queue_wait": job["queue_seconds"],
+        **telemetry["phases"],
+        # pool queueing, process hand-off, cache/store round trips
+        "overhead": round(max(0.0, wall - solver_phases), 4),
+    }
+    telemetry["job_seconds"] = round(wall, 4)
+    if job["threads"]:
+        telemetry["threads"] = job["threads"]
+
+    mode = job["mode"]
+    metrics.inc("schedule_jobs_total", status=job["status"], mode=mode)
+    metrics.observe("schedule_job_seconds", wall, mode=mode)
+    if result.get("cached"):
+        metrics.inc("schedule_cache_hits_total")
+    for phase, seconds in telemetry["phases"].items():
+        metrics.observe("schedule_phase_seconds", seconds, phase=phase)
+    if "model" in telemetry:
+        metrics.set_gauge("schedule_model_variables", telemetry["model"]["variables"])
+        metrics.set_gauge("schedule_model_constraints", telemetry["model"]["constraints"])
+        metrics.set_gauge("schedule_model_sessions", telemetry["model"]["sessions"])
+    if "solver" in telemetry:
+        metrics.observe("schedule_solver_conflicts", telemetry["solver"]["conflicts"])
+        metrics.observe("schedule_solver_branches", telemetry["solver"]["branches"])
+        metrics.observe("schedule_solver_wall_seconds", telemetry["solver"]["wall_time"])
+
+
+async def _run_job(job, *args):
+    try:
+        result = await _solve(job, *args)
+    except asyncio.CancelledError:
+        result = {"status": "cancelled", "message": "Schedule generation was cancelled"}
+    except Exception as e:
+        result = {"status": "fail", "message": f"Scheduler crashed: {e}"}
+        job["status"] = "failed"
+    finally:
+        if _inflight.get(job["cache_key"]) == job["id"]:
+            del _inflight[job["cache_key"]]
+
+    if job["status"] == "cancelled" or result.get("status") == "cancelled":
+        job["status"] = "cancelled"
+    elif job["status"] != "failed":
+        job["status"] = "done"
+
+    job["finished_at"] = time.time()
+    _add_job_telemetry(job, result)
+    job["result"] = result
+    _publish(job, {"type": "done", "status": job["status"], "result": result})
+    _prune_finished()
+
+
+async def submit_job(subjects, faculties, rooms, batches, warm_start=True, pin_unaffected=False, decompose=True,
+                     use_cache=True, mode="exact", solver=None, priority=0, fetch_seconds=0.0):
+    """
+    Queue a solve and return the job record right away. Raises SchedulerBusy
+    when the solver queue is full (and the answer isn't cached).
+
+    warm_start: hint the solver with the latest stored schedule
+    pin_unaffected: keep every session the input changes don't touch fixed
+    decompose: solve independent parts of the timetable in parallel (exact mode)
+    use_cache: answer from the snapshot cache, and join an identical job
+        that is already queued/running instead of solving twice
+    mode: "exact" (CP-SAT), "heuristic" (greedy only) or "anytime"
+        (greedy first, CP-SAT only if the greedy pass gets stuck) or
+        "interval" (CP-SAT with multi-slot sessions sized by duration_minutes)
+    solver: CP-SAT settings to pin (see solver_profiles.PROFILE_KEYS),
+        everything else is sized to the instance; num_workers is capped
+        by the threads the job is granted
+    priority: higher starts first when jobs wait for a solver slot
+    fetch_seconds: time the caller spent loading the inputs (telemetry)
+    """
+    if mode not in ENGINES:
+        raise ValueError(f"Unknown scheduler mode {mode!r}")
+    options = {
+        "warm_start": warm_start,
+        "pin_unaffected": pin_unaffected,
+        "decompose": decompose,
+        "mode": mode,
+        "solver": {k: v for k, v in (solver or {}).items() if v is not None},
+    }
+    fingerprints = schedule_store.input_fingerprints(subjects, faculties, rooms, batches)
+    cache_key = schedule_cache.snapshot_key(fingerprints, options)
+
+    if use_cache and cache_key in _inflight:
+        return _public(jobs[_inflight[cache_key]])
+
+    try:
+        solver_capacity.check_admission(
+            sum(1 for j in jobs.values() if j["finished_at"] is None and j["threads"] is None))
+    except SchedulerBusy:
+        # a cached answer needs no solver slot
+        if not use_cache or await schedule_cache.get_cached(cache_key) is None:
+            raise
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "stop_event": None,
+        "fingerprints": fingerprints,
+        "cache_key": cache_key,
+        "mode": mode,
+        "fetch_seconds": round(fetch_seconds, 4),
+        "queue_seconds": 0.0,
+        "threads": None,
+        "future": None,
+        "task": None,
+        "events": [],
+        "wakeup": asyncio.Event(),
+    }
+    jobs[job["id"]] = job
+    if use_cache:
+        _inflight[cache_key] = job["id"]
+
+    options["use_cache"] = use_cache
+    options["priority"] = priority
+    job["task"] = asyncio.create_task(_run_job(job, subjects, faculties, rooms, batches, options))
+    return _public(job)
+
+
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        return None
+    return _public(job)
+
+
+def stop_job(job_id: str):
+    """
+    End the search early but keep the best schedule found so far.
+    Returns None for an unknown id.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return None
+    if job["finished_at"] is None and job["stop_event"] is not None:
+        job["stop_event"].set()
+    return _public(job)
+
+
+async def stream_events(job_id: str, keepalive=15):
+    """
+    Async generator over a job's events: everything so far, then new events
+    as they arrive, ending with the "done" event. Yields None as keep-alive
+    when nothing happened for `keepalive` seconds.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return
+    sent = 0
+    while True:
+        wakeup = job["wakeup"]
+        while sent < len(job["events"]):
+            yield job["events"][sent]
+            sent += 1
+        if job["finished_at"] is not None:
+            return
+        try:
+            await asyncio.wait_for(wakeup.wait(), keepalive)
+        except asyncio.TimeoutError:
+            yield None
+
+
+def cancel_job(job_id: str):
+    """
+    Cancel a queued job, or ask a running solve to stop. Returns None for an
+    unknown id.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return None
+    if job["finished_at"] is None:
+        job["status"] = "cancelled"
+        if job["future"] is None:
+            # still loading or waiting for a solver slot
+            job["task"].cancel()
+        elif not job["future"].cancel():
+            job["stop_event"].set()
+    return _public(job)
+
+
+def shutdown():
+    global _executor, _manager
+    if _executor is not None:
+        for job in jobs.values():
+            if job["finished_at"] is None and job["stop_event"] is not None:
+                job["stop_event"].set()
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _manager.shutdown()
+    _executor = None
+    _manager = None
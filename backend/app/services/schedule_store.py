@@ -0,0 +1,210 @@
+# app/services/schedule_store.py
+# Persisted schedules + input fingerprints used for warm-start re-solves.
+#
+# Every version is also stored as one document per session in
+# schedule_entries, tagged with its day and the batches that attend it and
+# indexed per faculty / room / batch, so "what does X have on Tuesday" is an
+# index range scan instead of a filter over the whole timetable.
+import hashlib
+import json
+import time
+
+from pymongo import ReturnDocument
+
+from app.db import db
+from app.services.calendar_grid import SLOTS_PER_DAY
+
+schedules_col = db["schedules"]
+entries_col = db["schedule_entries"]
+counters_col = db["counters"]
+
+# counters document that hands out schedule version numbers
+VERSION_COUNTER = "schedule_version"
+_counter_synced = False
+
+# view name -> field of schedule_entries it is indexed on
+VIEW_FIELDS = {"faculty": "faculty_id", "room": "room_id", "batch": "batch_ids"}
+
+# fields that never influence the timetable
+IGNORED_FIELDS = {"_id", "password"}
+
+
+def _digest(doc: dict) -> str:
+    relevant = {k: v for k, v in doc.items() if k not in IGNORED_FIELDS}
+    raw = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def input_fingerprints(subjects, faculties, rooms, batches) -> dict:
+    """
+    Per-document hashes of the scheduling inputs, keyed by collection and id.
+    Stored next to a schedule so the next run can tell what changed.
+    """
+    return {
+        "subjects": {str(d.get("_id")): _digest(d) for d in subjects},
+        "faculties": {str(d.get("_id")): _digest(d) for d in faculties},
+        "rooms": {str(d.get("_id")): _digest(d) for d in rooms},
+        "batches": {str(d.get("_id")): _digest(d) for d in batches},
+    }
+
+
+def _changed_ids(old: dict, new: dict) -> set:
+    # added, modified and removed ids
+    return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+
+def unaffected_session_ids(previous_doc, subjects, faculties, batches, fingerprints) -> set:
+    """
+    Session ids of the previous schedule that can keep their assignment.
+
+    A session is affected (and re-optimised) when its subject changed, when it
+    was taught by / held in a faculty / room that changed, when a changed
+    faculty can now teach its subject, or when a changed batch takes it.
+    """
+    old = previous_doc.get("fingerprints", {})
+
+    changed_subjects = _changed_ids(old.get("subjects", {}), fingerprints["subjects"])
+    changed_faculties = _changed_ids(old.get("faculties", {}), fingerprints["faculties"])
+    changed_rooms = _changed_ids(old.get("rooms", {}), fingerprints["rooms"])
+    changed_batches = _changed_ids(old.get("batches", {}), fingerprints["batches"])
+
+    affected_codes = {s.get("code") for s in subjects if str(s.get("_id")) in changed_subjects}
+    for f in faculties:
+        if str(f.get("_id")) in changed_faculties:
+            affected_codes.update(f.get("subjects_can_teach", []))
+    for b in batches:
+        if str(b.get("_id")) in changed_batches:
+            affected_codes.update(b.get("subjects", []))
+
+    keep = set()
+    for entry in previous_doc.get("schedule", []):
+        if entry.get("subject_code") in affected_codes:
+            continue
+        if entry.get("faculty_id") in changed_faculties or entry.get("room_id") in changed_rooms:
+            continue
+        keep.add(entry["id"])
+    return keep
+
+
+async def ensure_indexes():
+    await schedules_col.create_index("version", unique=True)
+    await _sync_counter()
+    for field in VIEW_FIELDS.values():
+        # day then slot: equality on day, or the whole week already in slot order
+        await entries_col.create_index([("version", 1), (field, 1), ("day", 1), ("slot", 1)])
+
+
+def _entry_docs(version, schedule, batches):
+    attending = {}
+    for b in batches:
+        for code in b.get("subjects", []):
+            attending.setdefault(code, []).append(str(b.get("_id")))
+    return [
+        dict(entry, version=version, day=entry["slot"] // SLOTS_PER_DAY,
+             batch_ids=attending.get(entry.get("subject_code"), []))
+        for entry in schedule
+    ]
+
+
+async def get_latest_schedule():
+    return await schedules_col.find_one({}, sort=[("version", -1)])
+
+
+async def get_schedule(version: int):
+    return await schedules_col.find_one({"version": version})
+
+
+async def resolve_version(version: str):
+    """
+    "latest" or a version number -> stored version number, or None.
+    """
+    if version == "latest":
+        doc = await schedules_col.find_one({}, {"version": 1}, sort=[("version", -1)])
+    elif version.isdigit():
+        doc = await schedules_col.find_one({"version": int(version)}, {"version": 1})
+    else:
+        doc = None
+    return doc["version"] if doc else None
+
+
+async def _sync_counter():
+    # start the counter past versions stored before it existed
+    global _counter_synced
+    latest = await schedules_col.find_one({}, {"version": 1}, sort=[("version", -1)])
+    if latest:
+        await counters_col.update_one({"_id": VERSION_COUNTER}, {"$max": {"seq": latest["version"]}}, upsert=True)
+    _counter_synced = True
+
+
+async def _next_version():
+    # atomic: jobs finishing at the same time never get the same number
+    if not _counter_synced:
+        await _sync_counter()
+    doc = await counters_col.find_one_and_update(
+        {"_id": VERSION_COUNTER}, {"$inc": {"seq": 1}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    return doc["seq"]
+
+
+async def save_schedule(result: dict, fingerprints: dict, batches=()):
+    """
+    Store a successful solve as the next schedule version, with its
+    per-session view documents.
+    """
+    version = await _next_version()
+    # views first: the version becomes visible (latest, resolve_version)
+    # only once its entries are all there
+    if result["schedule"]:
+        await entries_col.insert_many(_entry_docs(version, result["schedule"], batches), ordered=False)
+    doc = {
+        "version": version,
+        "created_at": time.time(),
+        "schedule": result["schedule"],
+        "fingerprints": fingerprints,
+        "projected": True,
+    }
+    await schedules_col.insert_one(doc)
+    return version
+
+
+async def update_entry(version: int, entry: dict):
+    """
+    Replace one session of a stored version (manual edit), in the schedule
+    and in its view document.
+    """
+    day = entry["slot"] // SLOTS_PER_DAY
+    await schedules_col.update_one(
+        {"version": version, "schedule.id": entry["id"]},
+        {"$set": {"schedule.$": entry, "edited_at": time.time()}},
+    )
+    await entries_col.update_one(
+        {"version": version, "id": entry["id"]},
+        {"$set": dict(entry, day=day)},
+    )
+
+
+async def _ensure_projected(version: int):
+    # versions saved before the views existed get them on first use,
+    # with the batches as they are now
+    doc = await schedules_col.find_one({"version": version}, {"projected": 1, "schedule": 1})
+    if not doc or doc.get("projected"):
+        return
+    batches = await db["batches"].find({}, {"subjects": 1}).to_list(None)
+    await entries_col.delete_many({"version": version})
+    if doc["schedule"]:
+        await entries_col.insert_many(_entry_docs(version, doc["schedule"], batches), ordered=False)
+    await schedules_col.update_one({"version": version}, {"$set": {"projected": True}})
+
+
+async def get_view(version: int, view: str, key: str, day=None):
+    """
+    Sessions of one faculty / room / batch in a stored version, optionally
+    for a single day, in slot order.
+    """
+    await _ensure_projected(version)
+    query = {"version": version, VIEW_FIELDS[view]: key}
+    if day is not None:
+        query["day"] = day
+    cursor = entries_col.find(query, {"_id": 0, "version": 0, "batch_ids": 0}).sort([("day", 1), ("slot", 1)])
+    return await cursor.to_list(None)
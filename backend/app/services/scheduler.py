@@ -1,216 +1,687 @@
 # backend/app/services/scheduler.py
+import math
+import threading
+import time
+from collections import deque
 from ortools.sat.python import cp_model
-from datetime import datetime, timedelta
+from datetime import timedelta
+from app.services.calendar_grid import (
+    FULL_MASK,
+    SLOT_MINUTES,
+    TOTAL_SLOTS,
+    availability_mask,
+    slot_to_time,
+    to_slots,
+)
+from app.services.solver_profiles import apply_profile, choose_profile, next_profile
 
-# convert slot number to readable time
-def slot_to_time(slot, slots_per_day=8):
-    # slot 0 => day0 slot0 => Monday 08:00
-    base = datetime(2024, 1, 1, 8, 0)
-    day = slot // slots_per_day
-    hour = slot % slots_per_day
-    return base + timedelta(days=day, hours=hour)
 
+class ScheduleInputError(Exception):
+    """Raised while building the model when the input data can never be scheduled."""
 
-async def generate_schedule(subjects, faculties, rooms, batches):
+    def __init__(self, message, reasons=None):
+        super().__init__(message)
+        # every problem found, when there is more than one
+        self.reasons = list(reasons) if reasons else [message]
+
+
+class PhaseTimer:
     """
-    subjects: list of subject dicts (each must have 'code','name','weekly_sessions','duration_minutes')
-    faculties: list of faculty dicts (each must have '_id','name','subjects_can_teach' (list of codes), 'available_slots' (list of ints))
-    rooms: list of room dicts (each must have '_id','name','capacity')
-    batches: list of batch dicts (each must have 'name','student_count','subject_ids' (list of subject codes))
+    Wall-clock laps for telemetry: lap(name) records the time since the
+    previous lap under `name` (repeated names accumulate).
     """
 
-    # basic sanity checks
-    if not subjects or not faculties or not rooms or not batches:
-        return {"status": "fail", "message": "Missing data (subjects/faculty/rooms/batches)"}
+    def __init__(self):
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = round(self.phases.get(name, 0.0) + now - self._last, 4)
+        self._last = now
+
+
+def subject_required_sizes(subjects, batches):
+    # For each subject, compute required max batch size (max students among batches that have that subject)
+    subj_required_size = {}
+    for subj in subjects:
+        code = subj.get("code")
+        sizes = [b.get("student_count", 0) for b in batches if code in b.get("subject_ids", [])]
+        subj_required_size[code] = max(sizes) if sizes else 0
+    return subj_required_size
+
+
+def eligibility(subjects, faculties, rooms, batches):
+    """
+    Precompute what each subject may use.
+
+    Returns (fac_masks, subj_faculty, subj_rooms):
+      fac_masks:     faculty index => availability bitmask (see calendar_grid)
+      subj_faculty:  subject code => eligible faculty indices
+      subj_rooms:    subject code => indices of rooms that are large enough
+    Raises ScheduleInputError when a subject has no faculty or no room.
+    """
+    fac_masks = [availability_mask(f) for f in faculties]
+    fac_teaches_codes = [set(f.get("subjects_can_teach", [])) for f in faculties]
+
+    subj_required_size = subject_required_sizes(subjects, batches)
+
+    subj_faculty = {}
+    subj_rooms = {}
+    for subj in subjects:
+        code = subj.get("code")
+        # faculty must be able to teach this subject code and have some available slots
+        subj_faculty[code] = [f_idx for f_idx in range(len(faculties))
+                              if code in fac_teaches_codes[f_idx] and fac_masks[f_idx]]
+        if not subj_faculty[code]:
+            raise ScheduleInputError(f"No available faculty/slot for subject {code}")
+
+        required_size = subj_required_size.get(code, 0)
+        # if no batch includes this subject, allow any room
+        subj_rooms[code] = [r_idx for r_idx, r in enumerate(rooms) if r.get("capacity", 0) >= required_size]
+        if not subj_rooms[code]:
+            raise ScheduleInputError(f"No room with capacity for subject {code} (required {required_size})")
+
+    return fac_masks, subj_faculty, subj_rooms
+
+
+def _union(masks, idxs):
+    mask = 0
+    for idx in idxs:
+        mask |= masks[idx]
+    return mask
+
+
+def session_length(subject):
+    # consecutive slots one session of `subject` occupies
+    return max(1, math.ceil(int(subject.get("duration_minutes", SLOT_MINUTES)) / SLOT_MINUTES))
+
+
+# ----------------------------
+# PRE-CHECKS
+# ----------------------------
+
+def _transport(demand, capacity, edges):
+    """
+    Bipartite transport problem: can every source u ship demand[u] units to
+    its targets edges[u] without any target v taking more than capacity[v]?
+
+    Augmenting paths, trying free targets directly before searching.
+    Returns None when everything ships, otherwise a Hall violator
+    (sources, targets, demand, capacity): the sources left short, everything
+    they can reach in the residual graph, and the targets that reach can use.
+    """
+    free = dict(capacity)
+    flow = {}  # target -> {source: units}
+    short = []
 
-    DAYS = 5
-    SLOTS_PER_DAY = 8
-    TOTAL_SLOTS = DAYS * SLOTS_PER_DAY
+    for u, need in demand.items():
+        for v in edges[u]:
+            if need <= 0:
+                break
+            units = min(need, free[v])
+            if units > 0:
+                free[v] -= units
+                flow.setdefault(v, {})[u] = flow.get(v, {}).get(u, 0) + units
+                need -= units
 
+        while need > 0:
+            # BFS over source -> target (any) and target -> source (if it carries flow)
+            parent = {("s", u): None}
+            queue = deque([("s", u)])
+            end = None
+            while queue and end is None:
+                node = queue.popleft()
+                if node[0] == "s":
+                    for v in edges[node[1]]:
+                        if ("t", v) not in parent:
+                            parent[("t", v)] = node
+                            if free[v] > 0:
+                                end = ("t", v)
+                                break
+                            queue.append(("t", v))
+                else:
+                    for w, units in flow.get(node[1], {}).items():
+                        if units > 0 and ("s", w) not in parent:
+                            parent[("s", w)] = node
+                            queue.append(("s", w))
+            if end is None:
+                short.append(u)
+                break
+
+            path = []
+            node = end
+            while parent[node] is not None:
+                path.append((parent[node], node))
+                node = parent[node]
+            units = min(need, free[end[1]])
+            for a, b in path:
+                if a[0] == "t":  # backward edge: target a takes units away from source b
+                    units = min(units, flow[a[1]][b[1]])
+            for a, b in path:
+                if a[0] == "s":
+                    flow.setdefault(b[1], {})[a[1]] = flow.get(b[1], {}).get(a[1], 0) + units
+                else:
+                    flow[a[1]][b[1]] -= units
+            free[end[1]] -= units
+            need -= units
+
+    if not short:
+        return None
+
+    # everything reachable from the short sources: all its targets are full
+    sources, targets = set(short), set()
+    stack = list(short)
+    while stack:
+        u = stack.pop()
+        for v in edges[u]:
+            if v in targets:
+                continue
+            targets.add(v)
+            for w, units in flow.get(v, {}).items():
+                if units > 0 and w not in sources:
+                    sources.add(w)
+                    stack.append(w)
+    return sources, targets, sum(demand[u] for u in sources), sum(capacity[v] for v in targets)
+
+
+def _names(items, limit=5):
+    items = sorted(str(i) for i in items)
+    if len(items) > limit:
+        return ", ".join(items[:limit]) + f" and {len(items) - limit} more"
+    return ", ".join(items)
+
+
+def precheck(subjects, faculties, rooms, batches, multi_slot=False):
+    """
+    Counting / Hall-condition checks that prove infeasibility in milliseconds,
+    before any model is built. Returns (problems, eligible): a list of human
+    readable problems (empty when nothing is obviously wrong; the solve may
+    still fail) and the eligibility() result the checks were run on.
+
+      - faculty: sessions per subject vs. what the eligible faculty can take
+        (max_weekly_load, available slots), as a transport problem
+      - batches: a batch's sessions vs. the slots its subjects' faculty offer
+      - rooms:   sessions vs. room-slots, per required room size
+
+    multi_slot: count slots by duration (interval model) instead of one per session.
+    Raises ScheduleInputError on the eligibility problems eligibility() reports.
+    """
+    eligible = eligibility(subjects, faculties, rooms, batches)
+    fac_masks, subj_faculty, subj_rooms = eligible
+    problems = []
+
+    weekly = {}
+    slots_needed = {}
+    for subj in subjects:
+        code = subj.get("code")
+        weekly[code] = weekly.get(code, 0) + int(subj.get("weekly_sessions", 1))
+        length = session_length(subj) if multi_slot else 1
+        slots_needed[code] = slots_needed.get(code, 0) + int(subj.get("weekly_sessions", 1)) * length
+    n_sessions = sum(weekly.values())
+
+    # 1) faculty load: each faculty takes at most min(max_weekly_load, free slots) sessions
+    fac_capacity = {f_idx: min(int(f.get("max_weekly_load", n_sessions)), fac_masks[f_idx].bit_count())
+                    for f_idx, f in enumerate(faculties)}
+    gap = _transport(weekly, fac_capacity, subj_faculty)
+    if gap:
+        codes, fac_idxs, need, can = gap
+        problems.append(
+            f"Subjects {_names(codes)} need {need} sessions a week but the faculty who can teach them "
+            f"({_names(faculties[f_idx].get('name') for f_idx in fac_idxs)}) can take at most {can} "
+            f"(max_weekly_load / available slots)"
+        )
+
+    # slots in which some eligible faculty of the subject is available
+    subj_slots = {code: to_slots(_union(fac_masks, subj_faculty[code])) for code in weekly}
+
+    # 2) batches: a batch attends one session per slot
+    for b in batches:
+        codes = [c for c in dict.fromkeys(b.get("subjects", [])) if c in weekly]
+        need = sum(slots_needed[c] for c in codes)
+        if need > TOTAL_SLOTS:
+            problems.append(f"Batch {b.get('name')} needs {need} slots a week but the week has {TOTAL_SLOTS}")
+            continue
+        gap = _transport({c: slots_needed[c] for c in codes}, {t: 1 for t in range(TOTAL_SLOTS)}, subj_slots)
+        if gap:
+            codes, slots, need, can = gap
+            problems.append(
+                f"Batch {b.get('name')} needs {need} slots a week for {_names(codes)} "
+                f"but their faculty are only available in {can}"
+            )
+
+    # 3) rooms: rooms that fit a subject are all rooms from some capacity up,
+    # so Hall's condition per slot reduces to one transport per required size
+    required = subject_required_sizes(subjects, batches)
+    for size in sorted(set(required.values()), reverse=True):
+        codes = [c for c in weekly if required.get(c, 0) >= size]
+        fitting = sum(1 for r in rooms if r.get("capacity", 0) >= size)
+        gap = _transport({c: slots_needed[c] for c in codes}, {t: fitting for t in range(TOTAL_SLOTS)}, subj_slots)
+        if gap:
+            codes, slots, need, can = gap
+            room = f"a room for {size}+ students" if size else "a room"
+            problems.append(
+                f"{need} session slots of {_names(codes)} need {room} "
+                f"but only {can} such room-slots exist when their faculty are available"
+            )
+            break  # smaller sizes only add sessions and rooms on top of this one
+
+    return problems, eligible
+
+
+def make_entry(session_id, subject, faculty, room, slot, length=1):
+    # one row of the generated timetable
+    entry = {
+        "id": session_id,
+        "subject": subject.get("name"),
+        "subject_code": subject.get("code"),
+        "faculty": faculty.get("name"),
+        "faculty_id": str(faculty.get("_id")),
+        "room": room.get("name"),
+        "room_id": str(room.get("_id")),
+        "slot": slot,
+        "start": slot_to_time(slot).strftime("%Y-%m-%d %H:%M:%S"),
+        "end": (slot_to_time(slot) + timedelta(minutes=int(subject.get("duration_minutes", 60)))).strftime("%Y-%m-%d %H:%M:%S")
+    }
+    if length > 1:
+        # multi-slot session (interval engine): occupies slot .. slot + length - 1
+        entry["length"] = length
+    return entry
+
+
+def group_literal(model, groups, name):
+    """
+    Assumption literal that switches a group of constraints on, registered in
+    `groups` (variable index -> name) for explain_infeasibility. None when the model
+    is not built for an explanation.
+    """
+    if groups is None:
+        return None
+    lit = model.NewBoolVar(f"group: {name}")
+    groups[lit.Index()] = name
+    return lit
+
+
+def enforce_if(constraint, *lits):
+    # OnlyEnforceIf on the literals that are not None
+    lits = [lit for lit in lits if lit is not None]
+    if lits:
+        constraint.OnlyEnforceIf(lits)
+
+
+def _add_all_different(model, exprs, gate, span):
+    # AllDifferent takes no enforcement literal: with the gate off, every term
+    # is shifted into a range of its own so the constraint holds trivially
+    if gate is None:
+        model.AddAllDifferent(exprs)
+        return
+    shifted = []
+    for k, expr in enumerate(exprs):
+        z = model.NewIntVar(0, span * (k + 2) - 1, "")
+        model.Add(z == expr + span * (k + 1) - span * (k + 1) * gate)
+        shifted.append(z)
+    model.AddAllDifferent(shifted)
+
+
+def build_model(subjects, faculties, rooms, batches, timer=None, groups=None):
+    """
+    Build the CP-SAT model for the given input data.
+    Pass a PhaseTimer to get per-phase build timings.
+
+    Returns (model, sessions). Raises ScheduleInputError when some subject has
+    no eligible faculty/slot or no room that is large enough, or when
+    precheck() proves the input infeasible.
+
+    groups: pass a dict to get every constraint group (a faculty's
+    availability or load, a batch, faculty/room double booking) behind an
+    assumption literal, see explain_infeasibility. Slots then range over the
+    whole grid, so availability is only enforced by its group.
+
+    Variables are sparse: each session only gets literals for the faculty that
+    can teach its subject, and its faculty/room/slot domains are built from
+    the eligible faculty, their available slots and the rooms that fit.
+
+    No-double-booking is encoded on combined keys instead of pairwise
+    reification, so the model grows linearly with sessions:
+      - faculty:  AllDifferent(faculty_var * TOTAL_SLOTS + slot_var)
+      - room:     AllDifferent(room_var * TOTAL_SLOTS + slot_var)
+      - batch:    AllDifferent(slot_var) over the sessions of the batch
+    """
+    timer = timer or PhaseTimer()
     model = cp_model.CpModel()
 
     # index maps
     fac_count = len(faculties)
     room_count = len(rooms)
 
+    problems, (fac_masks, subj_faculty, subj_rooms) = precheck(subjects, faculties, rooms, batches)
+    if problems:
+        raise ScheduleInputError("; ".join(problems), problems)
+    timer.lap("precheck")
+
     # Build sessions: one session instance per subject per weekly session
     sessions = []
     for subj in subjects:
+        code = subj.get("code")
+        fac_options = subj_faculty[code]
+        room_options = subj_rooms[code]
+        # explaining: availability must be able to show up in the unsat core
+        slot_options = to_slots(FULL_MASK if groups is not None else _union(fac_masks, fac_options))
+
         weekly = int(subj.get("weekly_sessions", 1))
         for s in range(weekly):
             sessions.append({
                 "id": f"{str(subj.get('_id'))}_{s}",
                 "subject": subj,
-                "faculty_var": model.NewIntVar(0, fac_count - 1, f"fac_{subj.get('code')}_{s}"),
-                "room_var": model.NewIntVar(0, room_count - 1, f"room_{subj.get('code')}_{s}"),
-                "slot_var": model.NewIntVar(0, TOTAL_SLOTS - 1, f"slot_{subj.get('code')}_{s}")
+                "faculty_options": fac_options,
+                "room_options": room_options,
+                "faculty_var": model.NewIntVarFromDomain(cp_model.Domain.FromValues(fac_options), f"fac_{code}_{s}"),
+                "room_var": model.NewIntVarFromDomain(cp_model.Domain.FromValues(room_options), f"room_{code}_{s}"),
+                "slot_var": model.NewIntVarFromDomain(cp_model.Domain.FromValues(slot_options), f"slot_{code}_{s}"),
             })
-
-    # Precompute useful mappings:
-    # faculty index => its available slots set
-    fac_available = []
-    fac_teaches_codes = []
-    for f in faculties:
-        fac_available.append(set(f.get("available_slots", list(range(TOTAL_SLOTS)))))
-        fac_teaches_codes.append(set(f.get("subjects_can_teach", [])))
-
-    # For each subject, compute required max batch size (max students among batches that have that subject)
-    subj_required_size = {}
-    for subj in subjects:
-        code = subj.get("code")
-        sizes = [b.get("student_count", 0) for b in batches if code in b.get("subject_ids", [])]
-        subj_required_size[code] = max(sizes) if sizes else 0
-
-    # Build boolean helper vars for faculty equality and room equality
-    # b_fac[i][f] is true iff sessions[i].faculty_var == f
-    b_fac = []
-    for i, ses in enumerate(sessions):
-        row = []
-        for f_idx in range(fac_count):
-            b = model.NewBoolVar(f"ses{i}_is_fac{f_idx}")
-            # link boolean to equality
-            model.Add(ses["faculty_var"] == f_idx).OnlyEnforceIf(b)
-            model.Add(ses["faculty_var"] != f_idx).OnlyEnforceIf(b.Not())
-            row.append(b)
-        b_fac.append(row)
-
-    b_room = []
-    for i, ses in enumerate(sessions):
-        row = []
-        for r_idx in range(room_count):
-            b = model.NewBoolVar(f"ses{i}_is_room{r_idx}")
-            model.Add(ses["room_var"] == r_idx).OnlyEnforceIf(b)
-            model.Add(ses["room_var"] != r_idx).OnlyEnforceIf(b.Not())
-            row.append(b)
-        b_room.append(row)
+    timer.lap("variables")
 
     # ----------------------------
     # HARD CONSTRAINTS
     # ----------------------------
 
     # 1) Faculty eligibility + availability
-    # We'll constrain (faculty, slot) pairs to allowed pairs for each session based on subject code
+    # One literal per eligible faculty: exactly one is chosen, faculty_var follows it,
+    # and the chosen faculty's availability restricts slot_var.
+    available_gate = {}
     for i, ses in enumerate(sessions):
-        subj_code = ses["subject"].get("code")
-        allowed_pairs = []
-        for f_idx, f in enumerate(faculties):
-            # faculty must be able to teach this subject code
-            if subj_code in fac_teaches_codes[f_idx]:
-                # and faculty must have some available slots
-                for slot in fac_available[f_idx]:
-                    if 0 <= slot < TOTAL_SLOTS:
-                        allowed_pairs.append((f_idx, slot))
-        if not allowed_pairs:
-            return {"status": "fail", "message": f"No available faculty/slot for subject {subj_code}"}
-        # Add allowed pairs constraint on (faculty_var, slot_var)
-        model.AddAllowedAssignments([ses["faculty_var"], ses["slot_var"]], allowed_pairs)
-
-    # 2) Room capacity restriction (room chosen must be large enough)
-    for i, ses in enumerate(sessions):
-        subj_code = ses["subject"].get("code")
-        required_size = subj_required_size.get(subj_code, 0)
-        if required_size == 0:
-            # if no batch includes this subject, allow any room
-            continue
-        allowed_rooms = [r_idx for r_idx, r in enumerate(rooms) if r.get("capacity", 0) >= required_size]
-        if not allowed_rooms:
-            return {"status": "fail", "message": f"No room with capacity for subject {subj_code} (required {required_size})"}
-        model.AddAllowedAssignments([ses["room_var"]], [[r] for r in allowed_rooms])
+        lits = {}
+        for f_idx in ses["faculty_options"]:
+            lits[f_idx] = model.NewBoolVar(f"ses{i}_is_fac{f_idx}")
+        model.AddExactlyOne(lits.values())
+        model.Add(ses["faculty_var"] == sum(f_idx * lit for f_idx, lit in lits.items()))
+        for f_idx, lit in lits.items():
+            if fac_masks[f_idx] != FULL_MASK:
+                if f_idx not in available_gate:
+                    available_gate[f_idx] = group_literal(
+                        model, groups, f"available_slots of faculty {faculties[f_idx].get('name')}")
+                enforce_if(model.AddLinearExpressionInDomain(
+                    ses["slot_var"], cp_model.Domain.FromValues(to_slots(fac_masks[f_idx]))
+                ), lit, available_gate[f_idx])
+        ses["faculty_lits"] = lits
+    timer.lap("c_faculty_eligibility")
+
+    # 2) Room capacity restriction: already in the room_var domain
 
     # 3) Prevent faculty double booking:
-    # For each pair of sessions and each faculty, if both sessions assigned to same faculty -> slots must differ
-    n = len(sessions)
-    for i in range(n):
-        for j in range(i + 1, n):
-            for f_idx in range(fac_count):
-                # If both b_fac[i][f_idx] and b_fac[j][f_idx] are true -> enforce slot_i != slot_j
-                model.Add(sessions[i]["slot_var"] != sessions[j]["slot_var"]).OnlyEnforceIf([b_fac[i][f_idx], b_fac[j][f_idx]])
-
-    # 4) Prevent room double booking:
-    for i in range(n):
-        for j in range(i + 1, n):
-            for r_idx in range(room_count):
-                model.Add(sessions[i]["slot_var"] != sessions[j]["slot_var"]).OnlyEnforceIf([b_room[i][r_idx], b_room[j][r_idx]])
+    # (faculty, slot) is a single key per session -> all keys must differ
+    fac_keys = []
+    for i, ses in enumerate(sessions):
+        key = model.NewIntVar(0, fac_count * TOTAL_SLOTS - 1, f"fac_slot_{i}")
+        model.Add(key == ses["faculty_var"] * TOTAL_SLOTS + ses["slot_var"])
+        fac_keys.append(key)
+    if len(fac_keys) > 1:
+        _add_all_different(model, fac_keys, group_literal(model, groups, "faculty double booking"),
+                           fac_count * TOTAL_SLOTS)
+    timer.lap("c_faculty_clash")
+
+    # 4) Prevent room double booking (same idea on (room, slot)):
+    room_keys = []
+    for i, ses in enumerate(sessions):
+        key = model.NewIntVar(0, room_count * TOTAL_SLOTS - 1, f"room_slot_{i}")
+        model.Add(key == ses["room_var"] * TOTAL_SLOTS + ses["slot_var"])
+        room_keys.append(key)
+    if len(room_keys) > 1:
+        _add_all_different(model, room_keys, group_literal(model, groups, "room double booking"),
+                           room_count * TOTAL_SLOTS)
+    timer.lap("c_room_clash")
 
     # 5) Batch-level constraint: for each batch, sessions for subjects that that batch takes must not overlap
     for batch in batches:
         # Use 'subjects' from batch model, not 'subject_ids'
-        subj_codes = set(batch.get("subjects", [])) 
+        subj_codes = set(batch.get("subjects", []))
         # collect indices of sessions that are for subjects in this batch
         idxs = [idx for idx, ses in enumerate(sessions) if ses["subject"].get("code") in subj_codes]
-        
-        if not idxs:
-            continue # This batch has no subjects from the main list, skip.
 
-        for a in range(len(idxs)):
-            for b in range(a + 1, len(idxs)):
-                i = idxs[a]
-                j = idxs[b]
-                model.Add(sessions[i]["slot_var"] != sessions[j]["slot_var"])
+        if len(idxs) < 2:
+            continue # Nothing can overlap, skip.
+
+        _add_all_different(model, [sessions[i]["slot_var"] for i in idxs],
+                           group_literal(model, groups, f"one session at a time for batch {batch.get('name')}"),
+                           TOTAL_SLOTS)
+    timer.lap("c_batch_clash")
 
     # 6) (Optional) Faculty max weekly load - ensure a faculty is not assigned more than max_weekly_load sessions
     # We'll compute number of sessions assigned per faculty and bound it
+    fac_lits = [[] for _ in range(fac_count)]
+    for ses in sessions:
+        for f_idx, lit in ses["faculty_lits"].items():
+            fac_lits[f_idx].append(lit)
     for f_idx, f in enumerate(faculties):
         max_load = int(f.get("max_weekly_load", len(sessions)))
-        # sum of b_fac[i][f_idx] across i <= max_load
-        model.Add(sum(b_fac[i][f_idx] for i in range(n)) <= max_load)
+        if len(fac_lits[f_idx]) > max_load:
+            enforce_if(model.Add(sum(fac_lits[f_idx]) <= max_load),
+                     group_literal(model, groups, f"max_weekly_load of faculty {f.get('name')}"))
+    timer.lap("c_faculty_load")
+
+    return model, sessions
+
+
+def explain_infeasibility(subjects, faculties, rooms, batches, builder=None, time_limit=5.0):
+    """
+    Name the constraint groups behind an infeasible model. Every group is
+    switched on by an assumption literal and CP-SAT reports a subset of the
+    assumptions that is infeasible on its own (an unsat core).
+
+    Returns the group names, or [] when no core is found within time_limit.
+    """
+    groups = {}
+    try:
+        model, _ = (builder or build_model)(subjects, faculties, rooms, batches, groups=groups)
+    except ScheduleInputError as e:
+        return e.reasons
+    model.AddAssumptions([model.GetBoolVarFromProtoIndex(i) for i in groups])
 
-    # ----------------------------
-    # STRONG CONSTRAINTS (robust) - MOVED FROM LATER
-    # ----------------------------
-    # This section was previously after the solver.Solve() call, which was incorrect.
-    # It is now moved here, before the solver is called.
-
-    n = len(sessions)
-
-    # Create booleans that indicate whether two sessions are in the same slot
-    same_slot = {}
-    for i in range(n):
-        for j in range(i + 1, n):
-            b = model.NewBoolVar(f"same_slot_{i}_{j}")
-            # Link b ⇔ (slot_i == slot_j)
-            model.Add(sessions[i]["slot_var"] == sessions[j]["slot_var"]).OnlyEnforceIf(b)
-            model.Add(sessions[i]["slot_var"] != sessions[j]["slot_var"]).OnlyEnforceIf(b.Not())
-            same_slot[(i, j)] = b
-
-    # Prevent faculty double-booking robustly:
-    # If two sessions are assigned the same slot AND the same faculty -> forbidden
-    for i in range(n):
-        for j in range(i + 1, n):
-            sslot = same_slot[(i, j)]
-            # For each faculty index, if both sessions are assigned to that faculty and same slot -> forbidden
-            for f_idx in range(fac_count):
-                # Enforce: NOT( b_fac[i][f_idx] AND b_fac[j][f_idx] AND sslot )
-                model.AddBoolOr([
-                    b_fac[i][f_idx].Not(),
-                    b_fac[j][f_idx].Not(),
-                    sslot.Not()
-                ])
-
-    # Prevent room double-booking robustly:
-    for i in range(n):
-        for j in range(i + 1, n):
-            sslot = same_slot[(i, j)]
-            for r_idx in range(room_count):
-                model.AddBoolOr([
-                    b_room[i][r_idx].Not(),
-                    b_room[j][r_idx].Not(),
-                    sslot.Not()
-                ])
-                
-    # ----------------------------------------------------
-    # *** MOVED SOLVER BLOCK HERE ***
-    # This block was previously before the "STRONG CONSTRAINTS"
-    # ----------------------------------------------------
-    
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 15
-    solver.parameters.num_search_workers = 8
+    solver.parameters.max_time_in_seconds = time_limit
+    # cores come from the sequential search
+    solver.parameters.num_search_workers = 1
+    if solver.Solve(model) != cp_model.INFEASIBLE:
+        return []
+    return [groups[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in groups]
+
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Pushes each solution to `progress` (anything with put(), e.g. a
+    multiprocessing Manager queue) so clients can see a timetable early.
+
+    The models have no objective, so CP-SAT stops at the first feasible
+    schedule: that is the one solution a solve reports (a second one only
+    when dropped pins force a re-solve).
+    """
+
+    def __init__(self, sessions, faculties, rooms, progress, finalize=None):
+        super().__init__()
+        self.sessions = sessions
+        self.faculties = faculties
+        self.rooms = rooms
+        self.progress = progress
+        self.finalize = finalize
+
+    def on_solution_callback(self):
+        schedule = [
+            make_entry(ses["id"], ses["subject"], self.faculties[self.Value(ses["faculty_var"])],
+                       self.rooms[self.Value(ses["room_var"])], self.Value(ses["slot_var"]), ses.get("length", 1))
+            for ses in self.sessions
+        ]
+        if self.finalize:
+            self.finalize(schedule)
+        self.progress.put({
+            "type": "solution",
+            "elapsed": round(self.WallTime(), 3),
+            "schedule": schedule,
+        })
+
+
+def _watch_stop_event(solver, stop_event, done):
+    # poll the (cross-process) stop event and interrupt the search when it is set
+    while not done.is_set():
+        if stop_event.is_set():
+            solver.StopSearch()
+            return
+        done.wait(0.1)
 
-    result = solver.Solve(model)
 
+def apply_previous(model, sessions, faculties, rooms, previous, pinned_ids=()):
+    """
+    Warm start from a previous schedule (list of output entries).
+
+    Every session found in `previous` gets its old faculty/room/slot as a
+    solution hint. Sessions listed in `pinned_ids` are additionally fixed to
+    their old assignment with plain equalities, which presolve turns into
+    fixed variables (assumption literals would leave it nothing to remove).
+    If the pins turn out to be infeasible, rebuild the model and call this
+    again without them.
+
+    Returns the number of pinned sessions.
+    """
+    fac_index = {str(f.get("_id")): idx for idx, f in enumerate(faculties)}
+    room_index = {str(r.get("_id")): idx for idx, r in enumerate(rooms)}
+    by_id = {entry["id"]: entry for entry in previous}
+    pinned_ids = set(pinned_ids)
+
+    pinned = 0
+    for ses in sessions:
+        entry = by_id.get(ses["id"])
+        if not entry:
+            continue
+        fac_idx = fac_index.get(entry.get("faculty_id"))
+        room_idx = room_index.get(entry.get("room_id"))
+        # models that merge interchangeable rooms map each room to its stand-in
+        room_idx = ses.get("room_alias", {}).get(room_idx, room_idx)
+        slot = entry.get("slot")
+        if fac_idx not in ses["faculty_options"] or room_idx not in ses["room_options"] \
+                or slot is None or not 0 <= slot < TOTAL_SLOTS:
+            # the old assignment refers to data that no longer exists or is no longer eligible
+            continue
+
+        model.AddHint(ses["faculty_var"], fac_idx)
+        model.AddHint(ses["room_var"], room_idx)
+        model.AddHint(ses["slot_var"], slot)
+
+        if ses["id"] in pinned_ids:
+            model.Add(ses["faculty_var"] == fac_idx)
+            model.Add(ses["room_var"] == room_idx)
+            model.Add(ses["slot_var"] == slot)
+            pinned += 1
+    return pinned
+
+
+def solve_schedule(subjects, faculties, rooms, batches, stop_event=None, previous=None, pinned_ids=(), profile=None,
+                   progress=None, builder=None, finalize=None):
+    """
+    Synchronous solve, safe to run in a worker process.
+
+    previous: optional list of assignments from an earlier run, used as hints
+    pinned_ids: session ids from `previous` that should keep their assignment
+    profile: solver settings to pin (time_limit, num_workers, random_seed,
+        presolve_level); the rest is picked from the model size, and a solve
+        that runs out of time is retried once with the next size tier
+    progress: optional queue that receives each intermediate solution
+    builder: model builder with build_model's signature and session layout
+        (default build_model, one slot per session)
+    finalize: optional callable run on every schedule built from a solution,
+        before it is reported (e.g. to hand out concrete rooms)
+
+    Setting stop_event ends the search early: the best schedule found so far
+    is returned (with "stopped_early"), or "cancelled" if there is none yet.
+
+    subjects: list of subject dicts (each must have 'code','name','weekly_sessions','duration_minutes')
+    faculties: list of faculty dicts (each must have '_id','name','subjects_can_teach' (list of codes), 'availability_mask' (hex/int bitmask, see calendar_grid) or legacy 'available_slots')
+    rooms: list of room dicts (each must have '_id','name','capacity')
+    batches: list of batch dicts (each must have 'name','student_count','subject_ids' (list of subject codes))
+    """
+
+    # basic sanity checks
+    if not subjects or not faculties or not rooms or not batches:
+        return {"status": "fail", "message": "Missing data (subjects/faculty/rooms/batches)"}
+
+    timer = PhaseTimer()
+    try:
+        model, sessions = (builder or build_model)(subjects, faculties, rooms, batches, timer)
+    except ScheduleInputError as e:
+        return {"status": "fail", "message": str(e), "reasons": e.reasons}
+
+    pinned = 0
+    if previous:
+        pinned = apply_previous(model, sessions, faculties, rooms, previous, pinned_ids)
+        timer.lap("warm_start")
+
+    solver = cp_model.CpSolver()
+    overrides = profile
+    profile = choose_profile(len(sessions), overrides)
+    apply_profile(solver, profile)
+
+    callback = _ProgressCallback(sessions, faculties, rooms, progress, finalize) if progress is not None else None
+
+    escalated = False
+    done = threading.Event()
+    if stop_event is not None:
+        threading.Thread(target=_watch_stop_event, args=(solver, stop_event, done), daemon=True).start()
+    try:
+        result = solver.Solve(model, callback)
+        if pinned and result == cp_model.INFEASIBLE and not (stop_event is not None and stop_event.is_set()):
+            # the edit needs more than its neighbourhood to move: re-solve with hints only
+            timer.lap("solve")
+            model, sessions = (builder or build_model)(subjects, faculties, rooms, batches, timer)
+            apply_previous(model, sessions, faculties, rooms, previous)
+            timer.lap("warm_start")
+            pinned = 0
+            if callback is not None:
+                callback = _ProgressCallback(sessions, faculties, rooms, progress, finalize)
+            result = solver.Solve(model, callback)
+        bigger = next_profile(profile, overrides)
+        if result == cp_model.UNKNOWN and bigger and not (stop_event is not None and stop_event.is_set()):
+            # out of time without an answer: small but tight inputs get the next tier's budget
+            escalated = True
+            profile = bigger
+            apply_profile(solver, profile)
+            result = solver.Solve(model, callback)
+    finally:
+        done.set()
+    timer.lap("solve")
+
+    proto = model.Proto()
+    telemetry = {
+        "phases": timer.phases,
+        "model": {
+            "sessions": len(sessions),
+            "variables": len(proto.variables),
+            "constraints": len(proto.constraints),
+        },
+        "solver": {
+            "status": solver.StatusName(result),
+            "conflicts": solver.NumConflicts(),
+            "branches": solver.NumBranches(),
+            "wall_time": round(solver.WallTime(), 4),
+            "user_time": round(solver.UserTime(), 4),
+            "num_workers": profile["num_workers"],
+        },
+        "profile": profile,
+    }
+    if escalated:
+        telemetry["solver"]["escalated"] = True
+
+    stopped = stop_event is not None and stop_event.is_set()
     if result not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        return {"status": "fail", "message": "No valid schedule found"}
+        if stopped:
+            return {"status": "cancelled", "message": "Schedule generation was cancelled", "telemetry": telemetry}
+        if result != cp_model.INFEASIBLE:
+            return {"status": "fail", "telemetry": telemetry,
+                    "message": f"No valid schedule found within the {profile['time_limit']:g}s time limit"}
+        reasons = explain_infeasibility(subjects, faculties, rooms, batches, builder,
+                                        time_limit=min(5.0, profile["time_limit"]))
+        timer.lap("explain")
+        message = "No valid schedule exists"
+        if reasons:
+            message += ". These constraints conflict: " + "; ".join(reasons)
+        return {"status": "fail", "message": message, "reasons": reasons, "telemetry": telemetry}
 
     # Build output
     output = []
@@ -219,15 +690,21 @@ async def generate_schedule(subjects, faculties, rooms, batches):
         fac_idx = solver.Value(ses["faculty_var"])
         room_idx = solver.Value(ses["room_var"])
 
-        output.append({
-            "id": ses["id"],
-            "subject": ses["subject"].get("name"),
-            "subject_code": ses["subject"].get("code"),
-            "faculty": faculties[fac_idx].get("name"),
-            "room": rooms[room_idx].get("name"),
-            "slot": slot,
-            "start": slot_to_time(slot, SLOTS_PER_DAY).strftime("%Y-%m-%d %H:%M:%S"),
-            "end": (slot_to_time(slot, SLOTS_PER_DAY) + timedelta(minutes=int(ses["subject"].get("duration_minutes", 60)))).strftime("%Y-%m-%d %H:%M:%S")
-        })
+        output.append(make_entry(ses["id"], ses["subject"], faculties[fac_idx], rooms[room_idx], slot,
+                                 ses.get("length", 1)))
+    if finalize:
+        finalize(output)
+
+    timer.lap("output")
+    response = {"status": "success", "schedule": output, "pinned_sessions": pinned, "telemetry": telemetry}
+    if stopped:
+        response["stopped_early"] = True
+    return response
 
-    return {"status": "success", "schedule": output}
\ No newline at end of file
+
+async def generate_schedule(subjects, faculties, rooms, batches):
+    """
+    In-process entry point. Note that this blocks the event loop for the whole
+    solve; the API goes through app.services.schedule_jobs instead.
+    """
+    return solve_schedule(subjects, faculties, rooms, batches)
@@ -0,0 +1,137 @@
+# app/services/solver_capacity.py
+# Admission control for the solver pool.
+#
+# A job needs one solver slot (a pool process, SCHEDULER_WORKERS of them)
+# and a number of CP-SAT threads out of SCHEDULER_CPU_THREADS. Each job is
+# granted at most its fair share (threads / slots), so a big solve never
+# starves the next one and two simultaneous requests don't fight over the
+# same cores. Jobs that can't start yet wait in a priority queue (FIFO
+# within a priority); past SCHEDULER_MAX_QUEUE waiting jobs, new ones are
+# turned away with an estimate of when to retry.
+#
+# Everything here runs on the event loop, so plain module state is enough.
+import asyncio
+import heapq
+import itertools
+import math
+from collections import deque
+
+from app.config import settings
+from app.services import metrics
+from app.services.solver_profiles import cpu_budget
+
+_running = {}   # job id -> granted threads
+_waiting = []   # heap of (-priority, seq, job id, wanted threads, future)
+_seq = itertools.count()
+_recent = deque(maxlen=20)  # seconds the last solves held their slot
+
+# used before any job finished
+DEFAULT_JOB_SECONDS = 10.0
+
+metrics.describe("schedule_queue_depth", "Schedule jobs waiting for a solver slot")
+metrics.describe("schedule_threads_in_use", "CP-SAT threads granted to running solves")
+metrics.describe("schedule_rejected_total", "Schedule requests turned away because the queue was full")
+metrics.describe("schedule_queue_wait_seconds", "Time jobs waited for a solver slot")
+
+
+class SchedulerBusy(Exception):
+    """Raised when the solver queue is full; retry_after is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Scheduler is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _threads_in_use():
+    return sum(_running.values())
+
+
+def _update_gauges():
+    metrics.set_gauge("schedule_queue_depth", len(_waiting))
+    metrics.set_gauge("schedule_threads_in_use", _threads_in_use())
+
+
+def retry_after(queued):
+    """
+    Seconds until a newly queued job would likely start: recent solve time
+    times the number of rounds the `queued` jobs ahead of it need.
+    """
+    per_job = sum(_recent) / len(_recent) if _recent else DEFAULT_JOB_SECONDS
+    rounds = math.ceil((queued + 1) / max(1, settings.SCHEDULER_WORKERS))
+    return max(1, math.ceil(per_job * rounds))
+
+
+def check_admission(queued):
+    """
+    Raise SchedulerBusy when the queue is full. `queued` counts the jobs
+    that have not started solving yet, including those still loading their
+    warm start that haven't reached acquire().
+    """
+    # the first of them take the free slots instead of waiting
+    waiting = queued - max(0, settings.SCHEDULER_WORKERS - len(_running))
+    if waiting >= settings.SCHEDULER_MAX_QUEUE:
+        metrics.inc("schedule_rejected_total")
+        raise SchedulerBusy(retry_after(waiting))
+
+
+def queue_position(job_id):
+    """
+    1-based place of a waiting job in the queue, or None if it isn't waiting.
+    """
+    for position, (_, _, waiting_id, _, _) in enumerate(sorted(_waiting), start=1):
+        if waiting_id == job_id:
+            return position
+    return None
+
+
+def _dispatch():
+    # start waiting jobs while there is a free slot and thread budget for them
+    while _waiting and len(_running) < settings.SCHEDULER_WORKERS:
+        _, _, job_id, wanted, future = _waiting[0]
+        if future.done():  # cancelled while waiting
+            heapq.heappop(_waiting)
+            continue
+        if _threads_in_use() + wanted > settings.SCHEDULER_CPU_THREADS and _running:
+            break
+        heapq.heappop(_waiting)
+        _running[job_id] = wanted
+        future.set_result(wanted)
+    _update_gauges()
+
+
+async def acquire(job_id, threads, priority=0):
+    """
+    Wait for a solver slot. `threads` is what the solve would like to use;
+    returns the number of threads granted (at most the fair share).
+    Higher `priority` starts first, equal priorities in arrival order.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    wanted = max(1, min(int(threads), cpu_budget()))
+    heapq.heappush(_waiting, (-priority, next(_seq), job_id, wanted, future))
+    start = loop.time()
+    _dispatch()
+    try:
+        granted = await future
+    except asyncio.CancelledError:
+        if future.done() and not future.cancelled():
+            release(job_id)  # granted in the same tick it was cancelled
+        else:
+            _waiting[:] = [w for w in _waiting if w[2] != job_id]
+            heapq.heapify(_waiting)
+            _update_gauges()
+        raise
+    metrics.observe("schedule_queue_wait_seconds", loop.time() - start)
+    return granted
+
+
+def release(job_id, held_seconds=None):
+    """
+    Give back a job's slot and threads. held_seconds feeds the Retry-After
+    estimate.
+    """
+    if _running.pop(job_id, None) is None:
+        return
+    if held_seconds is not None:
+        _recent.append(held_seconds)
+    _dispatch()
@@ -0,0 +1,85 @@
+# app/services/solver_profiles.py
+# CP-SAT parameters per request, sized to the instance and the machine.
+#
+# Callers may pin any of the knobs below; everything they leave out is
+# picked from the model size and the CPU share one solve is allowed to use
+# (SCHEDULER_CPU_THREADS divided among SCHEDULER_WORKERS concurrent jobs).
+# A solve that runs out of time without an answer is retried once with the
+# next tier's budget (next_profile), unless the caller pinned time_limit.
+#
+# There is no gap setting: the models have no objective, so CP-SAT stops at
+# the first feasible schedule and an optimality gap would mean nothing.
+from app.config import settings
+
+# (max sessions, time limit seconds, max search workers, presolve level)
+SIZE_TIERS = [
+    (40, 2.0, 1, 1),
+    (200, 10.0, 4, 2),
+    (1000, 30.0, 8, 2),
+    (None, 60.0, 16, 2),
+]
+
+# what a caller is allowed to ask for
+MAX_TIME_LIMIT = 300.0
+PROFILE_KEYS = ("time_limit", "num_workers", "random_seed", "presolve_level")
+
+
+def cpu_budget():
+    """
+    Search workers one solve may use without oversubscribing the box.
+    """
+    return max(1, settings.SCHEDULER_CPU_THREADS // max(1, settings.SCHEDULER_WORKERS))
+
+
+def choose_profile(n_sessions, overrides=None):
+    """
+    Solver profile for a model with `n_sessions` sessions. `overrides` is a
+    dict with any of PROFILE_KEYS; None values are ignored.
+    """
+    for max_sessions, time_limit, workers, presolve in SIZE_TIERS:
+        if max_sessions is None or n_sessions <= max_sessions:
+            break
+
+    profile = {
+        "time_limit": time_limit,
+        "num_workers": workers,
+        "random_seed": 0,
+        "presolve_level": presolve,
+    }
+    for key, value in (overrides or {}).items():
+        if key in PROFILE_KEYS and value is not None:
+            profile[key] = value
+
+    profile["time_limit"] = min(float(profile["time_limit"]), MAX_TIME_LIMIT)
+    profile["num_workers"] = max(1, min(int(profile["num_workers"]), cpu_budget()))
+    return profile
+
+
+def next_profile(profile, overrides=None):
+    """
+    Profile of the next bigger tier, for retrying a solve that ran out of
+    time without an answer (tight small instances). Caller overrides still
+    apply; None when the caller pinned time_limit or there is no bigger tier.
+    """
+    overrides = {k: v for k, v in (overrides or {}).items() if v is not None}
+    if "time_limit" in overrides:
+        return None
+    for _, time_limit, workers, presolve in SIZE_TIERS:
+        if time_limit > profile["time_limit"]:
+            tier = {"time_limit": time_limit, "num_workers": workers, "presolve_level": presolve}
+            return choose_profile(0, {**tier, **overrides})
+    return None
+
+
+def apply_profile(solver, profile):
+    params = solver.parameters
+    params.max_time_in_seconds = profile["time_limit"]
+    params.num_search_workers = profile["num_workers"]
+    params.random_seed = int(profile["random_seed"])
+
+    # 0: off, 1: one cheap pass without probing, 2: CP-SAT's defaults; all
+    # three are set every time so a solver can be re-used with another profile
+    level = profile["presolve_level"]
+    params.cp_model_presolve = level != 0
+    params.max_presolve_iterations = 1 if level == 1 else 3
+    params.cp_model_probing_level = 0 if level == 1 else 2
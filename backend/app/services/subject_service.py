@@ -1,7 +1,10 @@
 # app/services/subject_service.py
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from app.db import db
-from app.models.subject import SubjectCreate, SubjectBase
+from app.models.subject import SubjectCreate, SubjectBase, SubjectOut
+from app.services import bulk_import, reference_data
+from app.services.listing import page_cursor
 
 subjects_col = db["subjects"]
 
@@ -15,28 +18,37 @@ def subject_to_dict(subject):
     return subject
 
 
+def subject_json(subject):
+    # one list item, as SubjectOut
+    return SubjectOut(id=str(subject.pop("_id")), **subject).model_dump_json()
+
+
 # -----------------------------
 # CREATE SUBJECT
 # -----------------------------
 async def create_subject(data: SubjectCreate):
-    # Check duplicate subject code
-    existing = await subjects_col.find_one({"code": data.code})
-    if existing:
+    doc = data.dict()
+    try:
+        result = await subjects_col.insert_one(doc)
+    except DuplicateKeyError:
+        # subject code already exists (unique index, see indexes.py)
         return None
+    reference_data.mark_changed("subjects", result.inserted_id)
+    return subject_to_dict(doc)
 
-    doc = data.dict()
-    result = await subjects_col.insert_one(doc)
 
-    created = await subjects_col.find_one({"_id": result.inserted_id})
-    return subject_to_dict(created)
+# -----------------------------
+# BULK CREATE (JSON array or CSV, see bulk_import.py)
+# -----------------------------
+async def bulk_create_subjects(rows: list):
+    return await bulk_import.import_rows(subjects_col, SubjectCreate, rows, unique="code")
 
 
 # -----------------------------
-# GET ALL SUBJECTS
+# LIST SUBJECTS (keyset pages, see listing.py)
 # -----------------------------
-async def get_all_subjects():
-    subjects = await subjects_col.find().to_list(None)
-    return [subject_to_dict(s) for s in subjects]
+def find_subjects(limit=None, after=None):
+    return page_cursor(subjects_col, limit, after)
 
 
 # -----------------------------
@@ -59,14 +71,14 @@ async def update_subject_details(subject_id: str, data: SubjectBase):
 
     update_data = {"$set": data.dict()}
 
-    result = await subjects_col.update_one(
-        {"_id": ObjectId(subject_id)}, update_data
+    # raises DuplicateKeyError when the new code is taken
+    updated = await subjects_col.find_one_and_update(
+        {"_id": ObjectId(subject_id)}, update_data, return_document=True
     )
 
-    if result.matched_count == 0:
+    if not updated:
         return None
-
-    updated = await subjects_col.find_one({"_id": ObjectId(subject_id)})
+    reference_data.mark_changed("subjects", ObjectId(subject_id))
     return subject_to_dict(updated)
 
 
@@ -78,4 +90,5 @@ async def remove_subject(subject_id: str):
         return False
 
     result = await subjects_col.delete_one({"_id": ObjectId(subject_id)})
+    reference_data.mark_changed("subjects", ObjectId(subject_id))
     return result.deleted_count > 0
@@ -0,0 +1,51 @@
+# app/services/ttl_cache.py
+# Size-bounded LRU whose entries each expire at their own deadline.
+# Used on the event loop only, so there is no locking.
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    At most `maxsize` entries; the least recently used one goes first.
+    Deadlines are wall-clock (time.time()) so they can come straight from
+    e.g. a JWT "exp" claim.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value, expires_at=None, ttl=None):
+        if expires_at is None:
+            expires_at = time.time() + ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        item = self._data.pop(key, None)
+        return item[0] if item else None
+
+    def pop_where(self, predicate):
+        # drop every entry whose value matches
+        for key in [k for k, (value, _) in self._data.items() if predicate(value)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,121 @@
+# bench_login.py
+# Login storm benchmark: password verification throughput and what it does
+# to everything else on the event loop.
+#
+#   python bench_login.py                      -> in-process: inline bcrypt vs the worker pool
+#   python bench_login.py --logins 200 --rounds 10
+#   python bench_login.py --url http://127.0.0.1:8000 --email a@b.c --password x
+#                                              -> against a running server: concurrent
+#                                                 /auth/login plus /metrics latency probes
+#
+# Event loop lag is how late a 10 ms ticker wakes up while the logins run; it
+# is the delay every other request (scheduling, CRUD) sees at that moment.
+import argparse, asyncio, os, statistics, sys, time
+
+# keep the motor client off the network: the app imports app.db on startup
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+TICK = 0.01
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def _ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def _storm(login, n, concurrency):
+    """
+    Run n logins, `concurrency` at a time, while measuring loop lag.
+    Returns (seconds, lags).
+    """
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            await login()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+def _report(name, n, elapsed, lags):
+    print(f"{name:<8} {n / elapsed:8.1f} logins/s   loop lag p50 {_pct(lags, 0.5) * 1000:7.1f} ms"
+          f"   p99 {_pct(lags, 0.99) * 1000:7.1f} ms   max {max(lags, default=0) * 1000:7.1f} ms")
+
+
+async def in_process(args):
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from app.services import passwords
+
+    hashed = passwords._hash(args.password)
+
+    async def inline():
+        # what the handlers used to do: bcrypt right on the event loop
+        passwords._verify(args.password, hashed)
+
+    async def pooled():
+        ok, _ = await passwords.verify_and_update(args.password, hashed)
+        assert ok
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, cost factor {args.rounds}, "
+          f"{os.cpu_count()} cpus, PASSWORD_HASH_WORKERS={passwords.settings.PASSWORD_HASH_WORKERS}")
+    for name, login in (("inline", inline), ("pool", pooled)):
+        elapsed, lags = await _storm(login, args.logins, args.concurrency)
+        _report(name, args.logins, elapsed, lags)
+
+
+async def against_server(args):
+    import httpx
+
+    probes = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        async def login():
+            r = await client.post("/auth/login", data={"username": args.email, "password": args.password})
+            if r.status_code not in (200, 503):
+                raise SystemExit(f"login failed: {r.status_code} {r.text}")
+
+        async def probe(stop):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/metrics")
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(stop))
+        elapsed, lags = await _storm(login, args.logins, args.concurrency)
+        stop.set()
+        await prober
+    _report("server", args.logins, elapsed, lags)
+    print(f"/metrics during the storm: p50 {_pct(probes, 0.5) * 1000:.1f} ms   "
+          f"p99 {_pct(probes, 0.99) * 1000:.1f} ms   ({len(probes)} probes, mean "
+          f"{statistics.fmean(probes) * 1000 if probes else 0:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor (in-process mode)")
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--email", default="faculty0@college.com")
+    parser.add_argument("--password", default="pass123")
+    args = parser.parse_args()
+    asyncio.run(against_server(args) if args.url else in_process(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# bench_scheduler.py
+# Offline benchmark suite for the scheduler hot path.
+# Runs in-process on seeded synthetic data: no server, no MongoDB, no network.
+#
+#   python bench_scheduler.py --model-only                 -> model size / build time at 100 / 500 / 2000 sessions
+#   python bench_scheduler.py                              -> full suite, results written to bench_results.json
+#   python bench_scheduler.py --sizes 50 200 --seeds 5     -> custom grid
+#   python bench_scheduler.py --save-baseline bench_baseline.json
+#   python bench_scheduler.py --compare bench_baseline.json  -> exit 1 on regressions
+import argparse, asyncio, json, os, platform, random, resource, sys, time, tracemalloc
+
+# keep the motor client off the network: the app imports app.db on startup
+os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+
+from app.services.scheduler import build_model, generate_schedule, TOTAL_SLOTS
+
+# a metric regresses when it is this much worse than the baseline
+REGRESSION_TOLERANCE = 0.25
+
+
+def make_instance(n_sessions, seed=42, faculty_per_subject=2.0, rooms_per_subject=0.75,
+                  overlap=0.25, slot_availability=1.0):
+    """
+    Seeded synthetic instance shaped like test_stress.py.
+
+    n_sessions:          total weekly sessions (~3 per subject)
+    faculty_per_subject: faculty headcount relative to subjects
+    rooms_per_subject:   room count relative to subjects
+    overlap:             batch overlap density, fraction of subjects each batch takes
+                         (0.25 -> every batch shares subjects with many others)
+    slot_availability:   fraction of the week each faculty is available
+    """
+    rnd = random.Random(seed)
+
+    # ~3 sessions per subject; rounding up keeps the last subject at <= 3 so no
+    # batch is over-full (the build's pre-checks reject those in milliseconds)
+    n_subjects = max(2, -(-n_sessions // 3))
+    n_faculty = max(2, int(n_subjects * faculty_per_subject))
+    n_rooms = max(1, int(n_subjects * rooms_per_subject))
+    n_batches = max(1, n_subjects // 2)
+
+    subjects = []
+    left = n_sessions
+    for i in range(n_subjects):
+        weekly = 3 if i < n_subjects - 1 else max(1, left)
+        weekly = min(weekly, left)
+        left -= weekly
+        subjects.append({
+            "_id": f"s{i}",
+            "name": f"Subject_{i}",
+            "code": f"SUB{i:04d}",
+            "weekly_sessions": weekly,
+            "duration_minutes": 60,
+        })
+    codes = [s["code"] for s in subjects]
+
+    faculties = []
+    n_available = max(1, int(TOTAL_SLOTS * slot_availability))
+    for i in range(n_faculty):
+        faculties.append({
+            "_id": f"f{i}",
+            "name": f"Faculty_{i}",
+            "max_weekly_load": rnd.randint(8, 16),
+            "subjects_can_teach": rnd.sample(codes, min(len(codes), rnd.randint(1, 3))),
+            "available_slots": sorted(rnd.sample(range(TOTAL_SLOTS), n_available)),
+        })
+    # guarantee at least 1 faculty per subject (like test_stress.py)
+    taught = {c for f in faculties for c in f["subjects_can_teach"]}
+    for code in codes:
+        if code not in taught:
+            rnd.choice(faculties)["subjects_can_teach"].append(code)
+
+    rooms = [{"_id": f"r{i}", "name": f"Room_{i}", "capacity": rnd.randint(60, 120)} for i in range(n_rooms)]
+
+    # a batch can't take more subjects than fit in a week
+    per_batch = max(1, min(len(codes), int(len(codes) * overlap), TOTAL_SLOTS // 3))
+    batches = []
+    for i in range(n_batches):
+        batches.append({
+            "_id": f"b{i}",
+            "name": f"BATCH_{i}",
+            "student_count": rnd.randint(80, 120),
+            "subjects": rnd.sample(codes, rnd.randint(max(1, per_batch - 1), per_batch)),
+        })
+
+    return subjects, faculties, rooms, batches
+
+
+def model_size(n_sessions):
+    subjects, faculties, rooms, batches = make_instance(n_sessions)
+
+    start = time.perf_counter()
+    model, sessions = build_model(subjects, faculties, rooms, batches)
+    elapsed = time.perf_counter() - start
+
+    proto = model.Proto()
+    n = len(sessions)
+    # what the old pairwise encoding posted: 2x (n^2/2 * (F + R)) + n^2/2 same_slot booleans
+    pairs = n * (n - 1) // 2
+    legacy = 2 * pairs * (len(faculties) + len(rooms)) + 2 * pairs
+
+    return {
+        "sessions": n,
+        "faculty": len(faculties),
+        "rooms": len(rooms),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "legacy_constraints_est": legacy,
+        "build_seconds": round(elapsed, 3),
+    }
+
+
+def run_case(n_sessions, seed, overlap, slot_availability):
+    instance = make_instance(n_sessions, seed=seed, overlap=overlap, slot_availability=slot_availability)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        model, sessions = build_model(*instance)
+        proto = model.Proto()
+        variables, constraints = len(proto.variables), len(proto.constraints)
+    except Exception:
+        variables = constraints = None
+    build = time.perf_counter() - start
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    result = asyncio.run(generate_schedule(*instance))
+    total = time.perf_counter() - start
+
+    return {
+        "sessions": n_sessions,
+        "seed": seed,
+        "overlap": overlap,
+        "slot_availability": slot_availability,
+        "variables": variables,
+        "constraints": constraints,
+        "build_seconds": round(build, 4),
+        # generate_schedule builds the model again, so the rest is search + output
+        "solve_seconds": round(max(0.0, total - build), 4),
+        "total_seconds": round(total, 4),
+        "build_peak_mb": round(build_peak / 2**20, 2),
+        "feasible": result.get("status") == "success",
+        "message": result.get("message"),
+    }
+
+
+def summarize(cases):
+    groups = {}
+    for c in cases:
+        groups.setdefault((c["sessions"], c["overlap"], c["slot_availability"]), []).append(c)
+    summary = []
+    for (sessions, overlap, avail), rows in sorted(groups.items()):
+        summary.append({
+            "key": f"{sessions}/{overlap}/{avail}",
+            "sessions": sessions,
+            "overlap": overlap,
+            "slot_availability": avail,
+            "runs": len(rows),
+            "feasibility_rate": round(sum(r["feasible"] for r in rows) / len(rows), 3),
+            "build_seconds": round(max(r["build_seconds"] for r in rows), 4),
+            "solve_seconds": round(max(r["solve_seconds"] for r in rows), 4),
+            "variables": max(r["variables"] or 0 for r in rows),
+            "constraints": max(r["constraints"] or 0 for r in rows),
+            "build_peak_mb": max(r["build_peak_mb"] for r in rows),
+        })
+    return summary
+
+
+def compare(summary, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = {row["key"]: row for row in json.load(fh)["summary"]}
+
+    regressions = []
+    for row in summary:
+        old = baseline.get(row["key"])
+        if not old:
+            continue
+        if row["feasibility_rate"] < old["feasibility_rate"]:
+            regressions.append(f"{row['key']}: feasibility {old['feasibility_rate']} -> {row['feasibility_rate']}")
+        for metric in ("build_seconds", "solve_seconds", "variables", "constraints", "build_peak_mb"):
+            # ignore noise on tiny timings
+            floor = 0.05 if metric.endswith("seconds") else 0
+            if row[metric] > max(old[metric] * (1 + REGRESSION_TOLERANCE), old[metric] + floor):
+                regressions.append(f"{row['key']}: {metric} {old[metric]} -> {row[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scheduler benchmark")
+    parser.add_argument("--model-only", action="store_true", help="only report model size / build time")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--seeds", type=int, default=3, help="instances per grid point")
+    parser.add_argument("--overlap", type=float, nargs="+", default=[0.1, 0.25])
+    parser.add_argument("--availability", type=float, nargs="+", default=[1.0, 0.5])
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to check for regressions")
+    args = parser.parse_args()
+
+    if args.model_only:
+        print(f"{'sessions':>8} {'faculty':>8} {'rooms':>6} {'vars':>10} {'constraints':>12} {'legacy(est)':>14} {'build s':>8}")
+        for size in args.sizes or [100, 500, 2000]:
+            r = model_size(size)
+            print(f"{r['sessions']:>8} {r['faculty']:>8} {r['rooms']:>6} {r['variables']:>10} "
+                  f"{r['constraints']:>12} {r['legacy_constraints_est']:>14} {r['build_seconds']:>8}")
+        return 0
+
+    cases = []
+    for size in args.sizes or [50, 100, 200, 400]:
+        for overlap in args.overlap:
+            for avail in args.availability:
+                for seed in range(args.seeds):
+                    case = run_case(size, seed, overlap, avail)
+                    cases.append(case)
+                    print(f"sessions={size:<5} overlap={overlap:<5} avail={avail:<4} seed={seed} "
+                          f"build={case['build_seconds']:.3f}s solve={case['solve_seconds']:.3f}s "
+                          f"vars={case['variables']} feasible={case['feasible']}")
+
+    summary = summarize(cases)
+    report = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        # process high-water mark, includes CP-SAT's native allocations
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "summary": summary,
+        "cases": cases,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nresults written to {args.out}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        regressions = compare(summary, args.compare)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# test_decomposition.py
+# Decomposed solves of timetables made of independent departments: every part
+# gets its own room budget, so the parts merge without the monolithic fallback.
+#
+#   python test_decomposition.py          (or: python -m pytest test_decomposition.py)
+#
+# The departments share nothing but the rooms, and faculty are only available
+# half the week, which crowds every part into the same few slots unless the
+# rooms are shared out before solving.
+import os, time
+
+# keep the motor client off the network: app.services imports app.db
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from bench_scheduler import make_instance
+from app.config import settings
+from app.services import decomposition
+
+
+def departments(n=4, sessions=25, seed=0):
+    """
+    n disjoint copies of a bench instance (own subjects, faculty and batches,
+    ids prefixed per department) over one shared set of rooms.
+    """
+    subjects, faculties, rooms, batches = [], [], [], []
+    for d in range(n):
+        instance = make_instance(sessions, seed=seed * 10 + d, overlap=0.1, slot_availability=0.5)
+        for out, docs in zip((subjects, faculties, rooms, batches), instance):
+            for doc in docs:
+                doc = dict(doc, _id=f"d{d}{doc['_id']}")
+                if "code" in doc:
+                    doc["code"] = f"D{d}{doc['code']}"
+                for key in ("subjects_can_teach", "subjects", "subject_ids"):
+                    if key in doc:
+                        doc[key] = [f"D{d}{code}" for code in doc[key]]
+                out.append(doc)
+    return subjects, faculties, rooms, batches
+
+
+def _solve(workers, seed):
+    saved = settings.SCHEDULER_COMPONENT_WORKERS
+    settings.SCHEDULER_COMPONENT_WORKERS = workers
+    try:
+        subjects, faculties, rooms, batches = departments(seed=seed)
+        return decomposition.solve_decomposed(subjects, faculties, rooms, batches), batches
+    finally:
+        settings.SCHEDULER_COMPONENT_WORKERS = saved
+        decomposition.shutdown()
+
+
+def _assert_merged(result, batches):
+    assert result["status"] == "success", result.get("message")
+    assert result["components"] >= 4
+    # "parts" only comes from the merge: the fallback reports one solve
+    assert "parts" in result["telemetry"], result["telemetry"]
+    assert decomposition.find_conflicts(result["schedule"], batches) == []
+
+
+def test_two_parts_merge():
+    for seed in range(2):
+        _assert_merged(*_solve(2, seed))
+
+
+def test_four_parts_merge():
+    for seed in range(2):
+        _assert_merged(*_solve(4, seed))
+
+
+def test_budgets_share_out_the_rooms():
+    subjects, faculties, rooms, batches = departments()
+    parts = decomposition._pack(decomposition.subject_components(subjects, faculties, batches),
+                                {s["code"]: s["weekly_sessions"] for s in subjects}, 4)
+    budgets = decomposition.room_budgets(parts, subjects, rooms, batches)
+    assert len(budgets) == len(parts)
+    for size in {size for budget in budgets for size, _ in budget}:
+        fitting = sum(1 for r in rooms if r.get("capacity", 0) >= size)
+        assert sum(cap for budget in budgets for s, cap in budget if s == size) <= fitting
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            start = time.perf_counter()
+            test()
+            print(f"{name:<45} ok   {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,137 @@
+# test_groq.py
+# Groq client against a local stub server: retries with backoff on 429/5xx,
+# the outbound concurrency cap, and GroqError when Groq keeps failing.
+#
+#   python test_groq.py          (or: python -m pytest test_groq.py)
+#
+# The stub is a plain HTTP server on 127.0.0.1 that answers from a script of
+# (status, headers) responses and then 200, recording every call.
+import asyncio, json, os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# keep the motor client off the network: app.services imports app.db
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from app.config import settings
+from app.services import groq_service
+
+ANSWER = {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+
+
+class StubGroq:
+    def __init__(self, script=(), delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.calls = []        # perf_counter() of every request
+        self.inflight = 0
+        self.max_inflight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like Groq
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub.lock:
+                    stub.calls.append(time.perf_counter())
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                    status, headers = stub.script.pop(0) if stub.script else (200, {})
+                time.sleep(stub.delay)
+                body = json.dumps(ANSWER if status == 200 else {"error": "stub"}).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stub.lock:
+                    stub.inflight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _run(stub, coro_fn, **config):
+    """
+    Point the client at the stub with `config` applied to settings, run
+    coro_fn() on a fresh loop and restore everything afterwards.
+    """
+    config = dict(GROQ_BASE_URL=stub.url, GROQ_HTTP2=False, **config)
+    saved = {key: getattr(settings, key) for key in config}
+
+    async def main():
+        groq_service.start()
+        try:
+            return await coro_fn()
+        finally:
+            await groq_service.stop()
+
+    for key, value in config.items():
+        setattr(settings, key, value)
+    try:
+        return asyncio.run(main())
+    finally:
+        for key, value in saved.items():
+            setattr(settings, key, value)
+
+
+def test_retries_429_honouring_retry_after():
+    with StubGroq([(429, {"Retry-After": "0.3"})]) as stub:
+        answer = _run(stub, lambda: groq_service.chat_completion({"messages": []}), GROQ_MAX_RETRIES=3)
+    assert answer == ANSWER
+    assert len(stub.calls) == 2, stub.calls
+    # the second call waited for Retry-After, not the (shorter) default backoff
+    assert stub.calls[1] - stub.calls[0] >= 0.3
+
+
+def test_gives_up_after_repeated_503():
+    retries = 3
+    base, groq_service.BACKOFF_BASE = groq_service.BACKOFF_BASE, 0.05
+    try:
+        with StubGroq([(503, {})] * 10) as stub:
+            async def call():
+                try:
+                    await groq_service.chat_completion({"messages": []})
+                except groq_service.GroqError as e:
+                    return e
+            error = _run(stub, call, GROQ_MAX_RETRIES=retries)
+    finally:
+        groq_service.BACKOFF_BASE = base
+    assert isinstance(error, groq_service.GroqError) and error.status_code == 503
+    assert len(stub.calls) == retries + 1, stub.calls
+    # exponential: 0.05, 0.1, 0.2 (plus up to 25% jitter each)
+    gaps = [b - a for a, b in zip(stub.calls, stub.calls[1:])]
+    for attempt, gap in enumerate(gaps):
+        assert 0.05 * 2 ** attempt <= gap < 0.05 * 2 ** attempt * 1.25 + 0.1, gaps
+
+
+def test_concurrency_cap():
+    with StubGroq(delay=0.2) as stub:
+        async def burst():
+            return await asyncio.gather(*(groq_service.chat_completion({"messages": []}) for _ in range(8)))
+        answers = _run(stub, burst, GROQ_MAX_CONCURRENCY=2, GROQ_MAX_CONNECTIONS=8)
+    assert answers == [ANSWER] * 8
+    assert len(stub.calls) == 8
+    assert stub.max_inflight == 2, stub.max_inflight
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            start = time.perf_counter()
+            test()
+            print(f"{name:<45} ok   {time.perf_counter() - start:.2f}s")
@@ -1,5 +1,5 @@
 # test_setup.py
-import requests, json
+import requests, json, time
 
 BASE = "http://127.0.0.1:8000"
 
@@ -59,6 +59,11 @@ for endpoint, payload in data:
     print(endpoint, r.status_code, r.text)
 
 print("\nCalling scheduler...")
-r = requests.post(BASE + "/schedule/generate", json={})
+job = requests.post(BASE + "/schedule/generate", json={}).json()
+while True:
+    r = requests.get(BASE + f"/schedule/jobs/{job['job_id']}")
+    if r.json()["finished_at"] is not None:
+        break
+    time.sleep(0.5)
 print("SCHEDULE:", r.status_code)
 print(r.text)
@@ -101,7 +101,14 @@ for i in range(10):
 # ----------------------------------------------------------------------
 print("\n🚀 RUNNING TIMETABLE GENERATOR...")
 start = time.time()
-res = requests.post(BASE + "/schedule/generate", json={})
+job = requests.post(BASE + "/schedule/generate", json={}).json()
+
+# generation runs as a background job -> poll until it finishes
+while True:
+    res = requests.get(BASE + f"/schedule/jobs/{job['job_id']}")
+    if res.json()["finished_at"] is not None:
+        break
+    time.sleep(0.5)
 end = time.time()
 
 print("\n⏱ Solver Time:", end - start, "seconds")